@@ -0,0 +1,6 @@
+#!/bin/bash
+# Разрешает потоковую репликацию для реплики из docker-compose.yml (профиль replica).
+# Выполняется только при первой инициализации базы данных.
+set -e
+
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,36 @@
+"""Case insensitive email.
+
+ID миграции: 54b9ec100b1d
+Изменяет: b6199c179936
+Дата создания: 12:14:37 19.10.2026 по МСК
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# Идентификаторы миграции, используются Alembic.
+revision: str = "54b9ec100b1d"
+down_revision: str | None = "b6199c179936"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Уникальный индекс по lower(email) заменяет обычное ограничение уникальности,
+    # миграция не применится, если уже есть email, отличающиеся только регистром
+    op.create_index(
+        "ix_users_email_lower",
+        "users",
+        [sa.text("lower(email)")],
+        unique=True,
+    )
+    op.drop_constraint("users_email_key", "users", type_="unique")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_unique_constraint("users_email_key", "users", ["email"])
+    op.drop_index("ix_users_email_lower", table_name="users")
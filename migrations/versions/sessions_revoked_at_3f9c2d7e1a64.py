@@ -0,0 +1,27 @@
+"""Sessions revoked at.
+
+ID миграции: 3f9c2d7e1a64
+Изменяет: 54b9ec100b1d
+Дата создания: 14:52:10 19.10.2026 по МСК
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# Идентификаторы миграции, используются Alembic.
+revision: str = "3f9c2d7e1a64"
+down_revision: str | None = "54b9ec100b1d"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("users", sa.Column("sessions_revoked_at", sa.DateTime(timezone=True)))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("users", "sessions_revoked_at")
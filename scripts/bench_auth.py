@@ -0,0 +1,88 @@
+"""Микробенчмарк цепочки зависимостей авторизации с кешем проверенных JWT и без него.
+
+Выполняет то же, что FastAPI для каждого авторизованного GET запроса: разбор куки в Cookies,
+optional_authorize_user (проверка токена и загрузка пользователя из базы данных)
+и authorize_user. Пользователь создаётся на время замера и удаляется после него, время
+запроса к базе данных одинаково в обоих режимах, поэтому разница - работа с JWT.
+
+Запуск из корня репозитория (настройки читаются так же, как приложением):
+    API_JWT_SECRET=... DATABASE_PS_URL=... DATABASE_RD_URL=... \
+        python scripts/bench_auth.py --iterations 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, cast
+
+from social_network_api.api.dependencies.auth import authorize_user, optional_authorize_user
+from social_network_api.db.connection import read_session_maker, session_maker
+from social_network_api.db.models import UserModel
+from social_network_api.schemas import Cookies
+from social_network_api.utils import auth
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class DisabledTokenCache:
+    """Кеш проверенных JWT, который ничего не хранит, - поведение до его появления."""
+
+    def get(self, token: str) -> dict[str, Any] | None:  # noqa: ARG002
+        return None
+
+    def add(self, token: str, payload: dict[str, Any]) -> None:
+        pass
+
+
+async def run_chain(cookie: str, iterations: int, db: AsyncSession) -> float:
+    """Выполняет цепочку iterations раз и возвращает среднее время одного запроса."""
+    rd = cast("Redis", None)  # Нужен только для refresh токенов
+
+    started_at = time.perf_counter()
+
+    for _ in range(iterations):
+        cookies = Cookies.model_validate({"access_token": cookie})
+        await authorize_user(await optional_authorize_user(cookies, db, rd))
+
+    return (time.perf_counter() - started_at) / iterations
+
+
+async def main(iterations: int, repeats: int) -> None:
+    user = UserModel(
+        name="bench", email=f"{uuid.uuid4().hex}@example.com", _password="bench-password"
+    )
+
+    async with session_maker() as db:
+        db.add(user)
+        await db.commit()
+
+    cookie = await auth.generate_access_token(user.id)
+    enabled = auth.verified_tokens
+
+    try:
+        async with read_session_maker() as db:
+            for name, tokens in (("без кеша", DisabledTokenCache()), ("с кешем", enabled)):
+                auth.verified_tokens = tokens  # pyright: ignore[reportAttributeAccessIssue]
+                await run_chain(cookie, iterations // 10, db)  # Прогрев
+                best = min([await run_chain(cookie, iterations, db) for _ in range(repeats)])
+                print(f"{name:>9}: {best * 1e6:7.2f} мкс на запрос, {1 / best:10.0f} запросов/с")
+    finally:
+        auth.verified_tokens = enabled
+
+        async with session_maker() as db:
+            await db.delete(await db.merge(user))
+            await db.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.iterations, args.repeats))
@@ -7,7 +7,9 @@ from __future__ import annotations
 
 from social_network_api.api.dependencies._common import cookies_dep, db_dep, rd_dep
 from social_network_api.api.dependencies.access import find_rule_info
-from social_network_api.api.dependencies.auth import auth_dep, optional_auth_dep
+from social_network_api.api.dependencies.auth import admin_dep, auth_dep, optional_auth_dep
+from social_network_api.api.dependencies.bulkhead import bulkheads, use_bulkhead
+from social_network_api.api.dependencies.cache import cached_reader_dep
 from social_network_api.api.dependencies.objects import (
     comment_dep,
     post_dep,
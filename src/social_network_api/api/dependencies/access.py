@@ -10,6 +10,8 @@ from social_network_api.api.dependencies._common import db_dep
 from social_network_api.api.dependencies.auth import optional_auth_dep
 from social_network_api.schemas import ACTION_TYPE, OBJECT_TYPE, RuleInfo
 from social_network_api.utils.access import get_rule_info
+from social_network_api.utils.timing import timed
+from social_network_api.utils.tracing import traced
 
 logger = logging.getLogger("social_network_api")
 
@@ -25,6 +27,10 @@ def find_rule_info(
         if not authorized_user:  # TODO(UnBut): #1 добавить роль guest
             raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Необходима авторизация")
 
-        return await get_rule_info(authorized_user, object_type, action, db)
+        with (
+            timed("rule"),
+            traced("find_rule_info", **{"rule.object_type": object_type, "rule.action": action}),
+        ):
+            return await get_rule_info(authorized_user, object_type, action, db)
 
     return Depends(wrapper)  # pyright: ignore[reportAny]
@@ -10,18 +10,35 @@ from fastapi import Depends, HTTPException, status
 from social_network_api.api.dependencies._common import cookies_dep, db_dep, rd_dep
 from social_network_api.db.models import UserModel
 from social_network_api.utils.auth import get_user_by_token
+from social_network_api.utils.timing import timed
+from social_network_api.utils.tracing import traced
 
 logger = logging.getLogger("social_network_api")
 
 
-async def authorize_user(
+async def optional_authorize_user(
     cookies: cookies_dep,
     db: db_dep,
     rd: rd_dep,
-) -> UserModel:
-    """Авторизует пользователя по токену из куки."""
+) -> UserModel | None:
+    """Может авторизовать пользователя, если передан токен."""
     if cookies.access_token:
-        return await get_user_by_token(cookies.access_token, "access", db, rd)
+        with timed("auth"), traced("optional_authorize_user"):
+            return await get_user_by_token(cookies.access_token, "access", db, rd)
+    return None
+
+
+optional_auth_dep = Annotated[UserModel | None, Depends(optional_authorize_user)]
+
+
+async def authorize_user(authorized_user: optional_auth_dep) -> UserModel:
+    """Авторизует пользователя по токену из куки.
+
+    Зависит от optional_authorize_user, чтобы FastAPI выполнял проверку токена
+    и загрузку пользователя один раз за запрос, даже если используются обе зависимости.
+    """
+    if authorized_user:
+        return authorized_user
 
     raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Необходима авторизация")
 
@@ -29,15 +46,12 @@ async def authorize_user(
 auth_dep = Annotated[UserModel, Depends(authorize_user)]
 
 
-async def optional_authorize_user(
-    cookies: cookies_dep,
-    db: db_dep,
-    rd: rd_dep,
-) -> UserModel | None:
-    """Может авторизовать пользователя, если передан токен."""
-    if cookies.access_token:
-        return await authorize_user(cookies, db, rd)
-    return None
+async def authorize_admin(authorized_user: auth_dep) -> UserModel:
+    """Пропускает только администраторов, например к эндпоинтам диагностики."""
+    if authorized_user.role == "admin":
+        return authorized_user
 
+    raise HTTPException(status.HTTP_403_FORBIDDEN, "Доступ только для администраторов")
 
-optional_auth_dep = Annotated[UserModel | None, Depends(optional_authorize_user)]
+
+admin_dep = Annotated[UserModel, Depends(authorize_admin)]
@@ -0,0 +1,77 @@
+"""Зависимость для разделения ресурсов между классами эндпоинтов."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any, Literal
+
+from fastapi import Depends, HTTPException, status
+
+from social_network_api.schemas import config
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+logger = logging.getLogger("social_network_api")
+
+BULKHEAD_TYPE = Literal["auth", "single_reads", "list_reads", "writes"]
+
+
+class Bulkhead:
+    """Ограничивает количество одновременных запросов одного класса эндпоинтов.
+
+    У каждого класса свой семафор, поэтому медленные запросы одного класса (например списков)
+    не занимают все соединения с базой данных и не мешают остальным (например входу).
+    Запрос, не получивший место за wait_timeout, отклоняется с 503.
+    """
+
+    def __init__(self, name: BULKHEAD_TYPE, limit: int, wait_timeout: float) -> None:
+        self.name = name
+        self.limit = limit
+        self.wait_timeout = wait_timeout
+
+        self.rejected_total = 0
+
+        self._semaphore = asyncio.Semaphore(limit)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "limit": self.limit,
+            "in_use": self.limit - self._semaphore._value,  # noqa: SLF001
+            "rejected_total": self.rejected_total,
+        }
+
+    async def __call__(self) -> AsyncIterator[None]:
+        """Занимает место в семафоре на время обработки запроса."""
+        try:
+            async with asyncio.timeout(self.wait_timeout):
+                await self._semaphore.acquire()
+        except TimeoutError:
+            self.rejected_total += 1
+            logger.warning("Нет свободных мест для запросов класса %s", self.name)
+            raise HTTPException(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                "Сервис перегружен, повторите запрос позже",
+                headers={"Retry-After": "1"},
+            )
+
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+
+bulkheads: dict[BULKHEAD_TYPE, Bulkhead] = {
+    name: Bulkhead(name, limit, config.concurrency.bulkhead_wait_seconds)
+    for name, limit in (
+        ("auth", config.concurrency.bulkhead_auth),
+        ("single_reads", config.concurrency.bulkhead_single_reads),
+        ("list_reads", config.concurrency.bulkhead_list_reads),
+        ("writes", config.concurrency.bulkhead_writes),
+    )
+}
+
+
+def use_bulkhead(name: BULKHEAD_TYPE) -> Any:
+    return Depends(bulkheads[name])
@@ -0,0 +1,61 @@
+"""Зависимость для чтения объектов через кеш."""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Annotated
+
+from fastapi import Depends, Request, Response
+
+from social_network_api.api.dependencies._common import db_dep
+from social_network_api.db.cache import response_cache
+from social_network_api.db.replicas import consistency_token
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Hashable
+
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger("social_network_api")
+
+
+@dataclass
+class CachedReader:
+    """Загружает объекты через кеш, если запрос не изменяет данные.
+
+    Объект из кеша может быть отдан нескольким запросам одновременно, поэтому кеш используется
+    только для GET запросов, которые не изменяют полученные объекты.
+    Запрос с токеном согласованности читает в обход кеша и объединения запросов: кеш других
+    воркеров и загрузки с отстающих реплик могут содержать данные до записи клиента.
+    Устаревший ответ помечается заголовками X-Cache-Status и Age.
+    Пользователь токена и правила ролей для авторизации через него не читаются: кеш отдельный
+    в каждом воркере, и деактивация или смена роли не сразу дошли бы до других воркеров.
+    """
+
+    request: Request
+    response: Response
+    db: AsyncSession
+
+    async def __call__[T](
+        self,
+        key: tuple[Hashable, ...],
+        loader: Callable[[AsyncSession], Awaitable[T]],
+    ) -> T:
+        if self.request.method != "GET" or consistency_token(self.request):
+            return await loader(self.db)
+
+        result = await response_cache.get(key, loader, self.db)
+
+        if result.stale:
+            self.response.headers["X-Cache-Status"] = "stale"
+            self.response.headers["Age"] = str(int(result.age))
+
+        return result.value
+
+
+def get_cached_reader(request: Request, response: Response, db: db_dep) -> CachedReader:
+    return CachedReader(request, response, db)
+
+
+cached_reader_dep = Annotated[CachedReader, Depends(get_cached_reader)]
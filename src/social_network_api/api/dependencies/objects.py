@@ -8,20 +8,26 @@ from typing import Annotated
 
 from fastapi import Depends, HTTPException, Path, status
 
-from social_network_api.api.dependencies._common import db_dep
+from social_network_api.api.dependencies.cache import cached_reader_dep
 from social_network_api.db.dal import CommentDAL, PostDAL, RoleRuleDAL, UserDAL
 from social_network_api.db.models import CommentModel, PostModel, RoleRuleModel, UserModel
 from social_network_api.schemas import RoleRuleGet
+from social_network_api.utils.timing import timed
+from social_network_api.utils.tracing import traced
 
 logger = logging.getLogger("social_network_api")
 
 
 async def receive_role_rule(
-    db: db_dep,
+    cached_reader: cached_reader_dep,
     role_rule: RoleRuleGet = Path(...),  # pyright: ignore[reportCallInDefaultInitializer]
 ) -> RoleRuleModel:
     try:
-        return await RoleRuleDAL.get(role_rule, db)
+        with timed("receive"), traced("receive_role_rule"):
+            return await cached_reader(
+                ("role_rules", *role_rule.model_dump().values()),
+                lambda db: RoleRuleDAL.get(role_rule, db),
+            )
     except LookupError:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Правило роли не найдено")
 
@@ -31,10 +37,13 @@ role_rule_dep = Annotated[RoleRuleModel, Depends(receive_role_rule)]
 
 async def receive_user(
     user_id: uuid.UUID,
-    db: db_dep,
+    cached_reader: cached_reader_dep,
 ) -> UserModel:
     try:
-        return await UserDAL.get_by_id(user_id, db)
+        with timed("receive"), traced("receive_user"):
+            return await cached_reader(
+                ("users", user_id), lambda db: UserDAL.get_by_id(user_id, db)
+            )
     except LookupError:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Пользователь не найден")
 
@@ -44,10 +53,13 @@ user_dep = Annotated[UserModel, Depends(receive_user)]
 
 async def receive_post(
     post_id: uuid.UUID,
-    db: db_dep,
+    cached_reader: cached_reader_dep,
 ) -> PostModel:
     try:
-        return await PostDAL.get_by_id(post_id, db)
+        with timed("receive"), traced("receive_post"):
+            return await cached_reader(
+                ("posts", post_id), lambda db: PostDAL.get_by_id(post_id, db)
+            )
     except LookupError:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Пост не найден")
 
@@ -57,10 +69,14 @@ post_dep = Annotated[PostModel, Depends(receive_post)]
 
 async def receive_comment(
     comment_id: uuid.UUID,
-    db: db_dep,
+    cached_reader: cached_reader_dep,
 ) -> CommentModel:
     try:
-        return await CommentDAL.get_by_id(comment_id, db)
+        with timed("receive"), traced("receive_comment"):
+            return await cached_reader(
+                ("comments", comment_id),
+                lambda db: CommentDAL.get_by_id(comment_id, db),
+            )
     except LookupError:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Комментарий не найден")
 
@@ -0,0 +1,18 @@
+"""ASGI middleware приложения."""
+
+# pyright: reportUnusedImport=false
+# ruff: noqa: F401, RUF100
+
+from __future__ import annotations
+
+from social_network_api.api.middlewares.concurrency import (
+    AdaptiveLimiter,
+    ConcurrencyLimitMiddleware,
+    concurrency_limiter,
+)
+from social_network_api.api.middlewares.metrics import MetricsMiddleware
+from social_network_api.api.middlewares.profiling import ProfilingMiddleware
+from social_network_api.api.middlewares.queries import QueryCountMiddleware
+from social_network_api.api.middlewares.request_id import RequestIdMiddleware
+from social_network_api.api.middlewares.timing import ServerTimingMiddleware
+from social_network_api.api.middlewares.tracing import TracingMiddleware
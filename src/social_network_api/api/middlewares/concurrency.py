@@ -0,0 +1,192 @@
+"""Middleware, ограничивающее количество одновременно обрабатываемых запросов."""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Literal
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+from social_network_api.schemas import config
+
+if TYPE_CHECKING:
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("social_network_api")
+
+PRIORITY = Literal["critical", "auth", "default"]
+
+# Классы приоритета по префиксу пути, проверяются по порядку
+PRIORITY_PREFIXES: tuple[tuple[str, PRIORITY], ...] = (
+    ("/health", "critical"),
+    ("/metrics", "critical"),
+    ("/auth", "auth"),
+)
+
+
+class AdaptiveLimiter:
+    """Адаптивный лимит одновременных запросов по алгоритму AIMD.
+
+    Лимит изменяется только при насыщении, когда заняты все места обычных запросов. Сигналом
+    перегрузки служит отношение среднего времени запроса к базовому - среднему времени запросов,
+    завершившихся при занятом не более чем наполовину лимите, поэтому медленные сами по себе
+    эндпоинты при низкой нагрузке лимит не уменьшают. Если при насыщении среднее время превышает
+    базовое в latency_tolerance раз, лимит умножается на backoff_ratio (не чаще одного раза
+    за среднее время запроса, чтобы одна волна медленных запросов не обрушила лимит), иначе
+    увеличивается на 1 / limit, то есть примерно на единицу за каждые limit запросов.
+    Если насыщения не было idle_reset_seconds, уменьшенный лимит возвращается к initial_limit.
+
+    Запросы класса critical не проходят через лимит. Запросы класса default могут занять только
+    default_share лимита, а оставшиеся места достаются запросам авторизации.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        latency_tolerance: float,
+        backoff_ratio: float,
+        default_share: float,
+        idle_reset_seconds: float,
+    ) -> None:
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.default_share = default_share
+        self.idle_reset_seconds = idle_reset_seconds
+
+        self.limit = float(initial_limit)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.accepted_total = 0
+        self.rejected_total: Counter[PRIORITY] = Counter()
+        self.latency_ewma = 0.0
+        self.latency_baseline = 0.0
+
+        self._decreased_at = 0.0
+        self._saturated_at = 0.0
+
+    def try_acquire(self, priority: PRIORITY) -> bool:
+        if (
+            self.limit < self.initial_limit
+            and time.monotonic() - self._saturated_at > self.idle_reset_seconds
+        ):
+            self.limit = float(self.initial_limit)
+
+        allowed = self.limit * (self.default_share if priority == "default" else 1.0)
+
+        if self.in_flight >= max(allowed, 1):
+            self.rejected_total[priority] += 1
+            return False
+
+        self.in_flight += 1
+        self.accepted_total += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+        return True
+
+    def release(self, latency: float) -> None:
+        # Экспоненциальное скользящее среднее времени запроса по последним ~10 запросам
+        self.latency_ewma = (
+            0.9 * self.latency_ewma + 0.1 * latency if self.latency_ewma else latency
+        )
+
+        if self.in_flight <= self.limit / 2 or not self.latency_baseline:
+            # Базовое время меняется медленно, по последним ~100 запросам при занятом не более
+            # чем наполовину лимите, чтобы в него не попадали запросы, ждавшие в очереди
+            self.latency_baseline = (
+                0.99 * self.latency_baseline + 0.01 * latency if self.latency_baseline else latency
+            )
+        elif self.in_flight >= self.limit * self.default_share:
+            now = self._saturated_at = time.monotonic()
+
+            if self.latency_ewma <= self.latency_tolerance * self.latency_baseline:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            elif now - self._decreased_at > self.latency_ewma:
+                self._decreased_at = now
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+
+        self.in_flight -= 1
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "accepted_total": self.accepted_total,
+            "rejected_auth_total": self.rejected_total["auth"],
+            "rejected_default_total": self.rejected_total["default"],
+            "latency_ewma_seconds": round(self.latency_ewma, 4),
+            "latency_baseline_seconds": round(self.latency_baseline, 4),
+        }
+
+
+concurrency_limiter = AdaptiveLimiter(
+    initial_limit=config.concurrency.initial_limit,
+    min_limit=config.concurrency.min_limit,
+    max_limit=config.concurrency.max_limit,
+    latency_tolerance=config.concurrency.latency_tolerance,
+    backoff_ratio=config.concurrency.backoff_ratio,
+    default_share=config.concurrency.default_share,
+    idle_reset_seconds=config.concurrency.idle_reset_seconds,
+)
+
+
+class ConcurrencyLimitMiddleware:
+    """Сразу отвечает 503 с Retry-After на запросы сверх адаптивного лимита.
+
+    Время запроса измеряется до отправки последней части тела ответа.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: AdaptiveLimiter, retry_after: int) -> None:
+        self.app = app
+        self.limiter = limiter
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Обрабатывает запрос, если для него есть место в лимите."""
+        # Запросы critical не учитываются, чтобы частые проверки состояния не влияли на лимит
+        if scope["type"] != "http" or (priority := self._priority(scope["path"])) == "critical":
+            await self.app(scope, receive, send)
+            return
+
+        if not self.limiter.try_acquire(priority):
+            response = JSONResponse(
+                {"detail": "Сервис перегружен, повторите запрос позже"},
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        released = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal released
+
+            await send(message)
+
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                released = True
+                self.limiter.release(time.perf_counter() - started_at)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not released:
+                self.limiter.release(time.perf_counter() - started_at)
+
+    @staticmethod
+    def _priority(path: str) -> PRIORITY:
+        for prefix, priority in PRIORITY_PREFIXES:
+            if path.startswith(prefix):
+                return priority
+
+        return "default"
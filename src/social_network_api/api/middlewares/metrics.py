@@ -0,0 +1,53 @@
+"""Middleware, собирающее метрики запросов к API."""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+from social_network_api.utils.metrics import http_request_duration, http_requests_in_flight
+
+if TYPE_CHECKING:
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class MetricsMiddleware:
+    """Считает обрабатываемые запросы и время их обработки по маршруту и статусу ответа.
+
+    Маршрут берётся из шаблона пути (например /posts/{post_id}), чтобы количество значений
+    метки не зависело от идентификаторов. Запросы, не дошедшие до маршрута (например отклонённые
+    ограничением нагрузки или к несуществующему пути), учитываются с маршрутом unmatched.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Выполняет запрос, замеряя время до отправки последней части ответа."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        started_at = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+            await send(message)
+
+        http_requests_in_flight.labels(method).inc()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.labels(method).dec()
+            http_request_duration.labels(
+                method=method,
+                route=getattr(scope.get("route"), "path", "unmatched"),
+                status=str(status_code),
+            ).observe(time.perf_counter() - started_at)
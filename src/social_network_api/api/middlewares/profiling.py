@@ -0,0 +1,111 @@
+"""Middleware, профилирующее отдельные запросы администраторов."""
+
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import logging
+import math
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from fastapi import HTTPException
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import HTTPConnection
+
+from social_network_api.db.connection import read_session_maker
+from social_network_api.db.dal import UserDAL
+from social_network_api.utils.auth import decode_token
+from social_network_api.utils.logs import current_request_id
+
+if TYPE_CHECKING:
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("social_network_api")
+
+
+class ProfilingMiddleware:
+    """Выполняет запрос администратора с заголовком X-Profile под cProfile.
+
+    Профиль сохраняется в directory в формате pstats (открывается snakeviz или pstats),
+    а имя файла возвращается в заголовке X-Profile. Профилируется не чаще одного запроса
+    в min_interval на воркер, иначе в заголовке возвращается rate-limited. cProfile
+    записывает всё, что выполняется в цикле событий, поэтому в профиль попадают и
+    одновременные запросы. Запросы без заголовка не проверяются и не замедляются.
+    """
+
+    def __init__(self, app: ASGIApp, *, directory: str, min_interval: float) -> None:
+        self.app = app
+        self.directory = Path(directory)
+        self.min_interval = min_interval
+
+        self._last_started_at = -math.inf
+        self._active = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Выполняет запрос, профилируя его, если это разрешено."""
+        if scope["type"] != "http" or "x-profile" not in Headers(scope=scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not await self._is_admin(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if self._active or time.monotonic() - self._last_started_at < self.min_interval:
+            await self.app(scope, receive, self._with_header(send, "rate-limited"))
+            return
+
+        self._active = True
+        self._last_started_at = time.monotonic()
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{current_request_id() or 'request'}.prof"
+        profiler = cProfile.Profile()
+
+        try:
+            profiler.enable()
+
+            try:
+                await self.app(scope, receive, self._with_header(send, name))
+            finally:
+                profiler.disable()
+
+            await asyncio.to_thread(self._save, profiler, name)
+        finally:
+            self._active = False
+
+        logger.info("Профиль %s %s сохранён в %s", scope["method"], scope["path"], name)
+
+    def _save(self, profiler: cProfile.Profile, name: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(self.directory / name)
+
+    @staticmethod
+    def _with_header(send: Send, value: str) -> Send:
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile"] = value
+
+            await send(message)
+
+        return send_wrapper
+
+    @staticmethod
+    async def _is_admin(scope: Scope) -> bool:
+        if not (token := HTTPConnection(scope).cookies.get("access_token")):
+            return False
+
+        try:
+            payload = decode_token(token, "access")
+
+            async with read_session_maker() as db:
+                user = await UserDAL.get_by_id(payload["sub"], db)
+        except (HTTPException, LookupError, ValueError):
+            return False
+        except (SQLAlchemyError, OSError):
+            # Недоступная БД не должна ломать запрос: он просто не профилируется
+            logger.warning("Не удалось проверить роль для профилирования", exc_info=True)
+            return False
+
+        return user.is_active and user.role == "admin"
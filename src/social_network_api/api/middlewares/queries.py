@@ -0,0 +1,56 @@
+"""Middleware, считающее запросы к базе данных для каждого запроса к API."""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+from starlette.datastructures import MutableHeaders
+
+from social_network_api.db.instrumentation import bind_request, track_queries
+
+if TYPE_CHECKING:
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("social_network_api.queries")
+
+
+class QueryCountMiddleware:
+    """Считает запросы к базе данных и их время для каждого запроса к API.
+
+    Результат записывается в лог: на уровне WARNING, если запросов больше warn_threshold,
+    иначе на уровне DEBUG. При debug_headers он также возвращается в заголовках
+    X-DB-Queries и X-DB-Time (в миллисекундах).
+    """
+
+    def __init__(self, app: ASGIApp, *, debug_headers: bool, warn_threshold: int) -> None:
+        self.app = app
+        self.debug_headers = debug_headers
+        self.warn_threshold = warn_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Выполняет запрос, считая обращения к базе данных."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with bind_request(scope), track_queries() as stats:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start" and self.debug_headers:
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Queries"] = str(stats.count)
+                    headers["X-DB-Time"] = f"{stats.duration * 1000:.1f}"
+
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        logger.log(
+            logging.WARNING if stats.count > self.warn_threshold else logging.DEBUG,
+            "%s %s: %d запросов к БД за %.1f мс",
+            scope["method"],
+            scope["path"],
+            stats.count,
+            stats.duration * 1000,
+        )
@@ -0,0 +1,39 @@
+"""Middleware, назначающее идентификатор каждому запросу к API."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from social_network_api.utils.logs import bind_request_id
+
+if TYPE_CHECKING:
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class RequestIdMiddleware:
+    """Берёт идентификатор запроса из заголовка X-Request-ID или создаёт новый.
+
+    Идентификатор добавляется ко всем записям логов запроса и возвращается клиенту
+    в заголовке X-Request-ID.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Выполняет запрос с назначенным идентификатором."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with bind_request_id(Headers(scope=scope).get("x-request-id")) as request_id:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message)["X-Request-ID"] = request_id
+
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,82 @@
+"""Middleware, сообщающее время этапов обработки выбранных запросов."""
+
+from __future__ import annotations
+
+import logging
+import random
+import time
+from typing import TYPE_CHECKING
+
+from starlette.datastructures import MutableHeaders
+
+from social_network_api.db.instrumentation import track_queries
+from social_network_api.utils.timing import track_timings
+
+if TYPE_CHECKING:
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+    from social_network_api.db.instrumentation import QueryStats
+    from social_network_api.utils.timing import RequestTimings
+
+logger = logging.getLogger("social_network_api")
+
+
+class ServerTimingMiddleware:
+    """Замеряет этапы обработки доли sample_rate запросов.
+
+    Для выбранного запроса время этапов (auth, jwt, rule, receive, dal, bcrypt, handler, encode),
+    время SQL запросов (db) и общее время до начала ответа (total) возвращаются в заголовке
+    Server-Timing и записываются в лог на уровне INFO. Значения этапов в лог передаются
+    в extra["server_timing"] в миллисекундах. Остальные запросы обрабатываются без замеров.
+    """
+
+    def __init__(self, app: ASGIApp, *, sample_rate: float) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Выполняет запрос, замеряя его этапы, если он выбран для замера."""
+        if scope["type"] != "http" or random.random() >= self.sample_rate:  # noqa: S311
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        status_code = 500
+        phases: dict[str, float] = {}
+
+        with track_timings() as timings, track_queries() as queries:
+
+            async def send_wrapper(message: Message) -> None:
+                nonlocal status_code, phases
+
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    phases = self._collect(timings, queries, time.perf_counter() - started_at)
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing",
+                        ", ".join(f"{name};dur={duration}" for name, duration in phases.items()),
+                    )
+
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        route = scope.get("route")
+        logger.info(
+            "Server-Timing %s %s %d: %s",
+            scope["method"],
+            getattr(route, "path", scope["path"]),
+            status_code,
+            phases,
+            extra={"server_timing": phases},
+        )
+
+    @staticmethod
+    def _collect(timings: RequestTimings, queries: QueryStats, total: float) -> dict[str, float]:
+        phases = {name: round(duration * 1000, 2) for name, (duration, _) in timings.phases.items()}
+
+        if queries.count:
+            phases["db"] = round(queries.duration * 1000, 2)
+
+        phases["total"] = round(total * 1000, 2)
+        return phases
@@ -0,0 +1,73 @@
+"""Middleware, создающее корневой span трассировки для запросов к API."""
+
+from __future__ import annotations
+
+import ipaddress
+from typing import TYPE_CHECKING
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from social_network_api.utils.tracing import tracer, use_span
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from pydantic import IPvAnyNetwork
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class TracingMiddleware:
+    """Начинает трассировку запроса или продолжает трассировку из заголовка traceparent.
+
+    Флаг sampled из traceparent учитывается только для клиентов из trusted_networks.
+    Span запроса получает имя по шаблону маршрута (например GET /posts/{post_id}), а его
+    идентификатор трассировки возвращается клиенту в заголовке X-Trace-Id.
+    """
+
+    def __init__(self, app: ASGIApp, *, trusted_networks: Sequence[IPvAnyNetwork] = ()) -> None:
+        self.app = app
+        self.trusted_networks = tuple(trusted_networks)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Выполняет запрос внутри span, если запрос выбран для трассировки."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        span = tracer.start_trace(
+            f"{scope['method']} {scope['path']}",
+            Headers(scope=scope).get("traceparent"),
+            trusted=self._is_trusted(scope),
+            **{"http.request.method": scope["method"], "url.path": scope["path"]},
+        )
+
+        if span is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                span.attributes["http.response.status_code"] = message["status"]
+                MutableHeaders(scope=message)["X-Trace-Id"] = span.trace_id
+
+            await send(message)
+
+        with use_span(span):
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # Маршрут известен только после выбора обработчика
+                if route := getattr(scope.get("route"), "path", None):
+                    span.name = f"{scope['method']} {route}"
+                    span.attributes["http.route"] = route
+
+    def _is_trusted(self, scope: Scope) -> bool:
+        if not self.trusted_networks or not (client := scope.get("client")):
+            return False
+
+        try:
+            address = ipaddress.ip_address(client[0])
+        except ValueError:
+            return False
+
+        return any(address in network for network in self.trusted_networks)
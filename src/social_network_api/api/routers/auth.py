@@ -6,18 +6,22 @@ import logging
 
 from fastapi import APIRouter, HTTPException, Response, status
 
-from social_network_api.api.dependencies import cookies_dep, db_dep, rd_dep
+from social_network_api.api.dependencies import auth_dep, cookies_dep, db_dep, rd_dep, use_bulkhead
+from social_network_api.db.bloom import email_filter
 from social_network_api.db.dal import UserDAL
 from social_network_api.schemas import AuthResponse, AuthWithEmail, UserResponse
 from social_network_api.utils.auth import (
     create_user_tokens,
     delete_user_tokens,
-    get_user_by_token,
+    revoke_sessions_after_write,
+    rotate_user_tokens,
 )
+from social_network_api.utils.timing import TimedRoute
 
-logger = logging.getLogger("social_network_api")
+logger = logging.getLogger("social_network_api.auth")
 router = APIRouter(
     prefix="/auth",
+    route_class=TimedRoute,
     tags=["Авторизация"],
     responses={
         status.HTTP_404_NOT_FOUND: {"description": "Пользователь не найден"},
@@ -27,6 +31,7 @@ router = APIRouter(
 
 @router.post(
     "/",
+    dependencies=[use_bulkhead("auth")],
     summary="Авторизоваться в аккаунт",
     response_description="Токены и пользователь: авторизация успешно завершена",
     responses={
@@ -43,6 +48,9 @@ async def login(
     response: Response,
 ) -> AuthResponse:
     try:
+        if not await email_filter.might_contain(auth_info.email, rd):
+            raise LookupError
+
         user = await UserDAL.get_with_email(auth_info.email, db)
 
         if not user.is_active or not user.check_password(auth_info.password):
@@ -56,6 +64,7 @@ async def login(
 
 @router.post(
     "/refresh",
+    dependencies=[use_bulkhead("auth")],
     summary="Обновить токены по refresh токену",
     response_description="Токены и пользователь: обновление токенов успешно завершено",
     responses={
@@ -71,15 +80,12 @@ async def refresh_access_token(
     if cookies.refresh_token is None:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Необходима авторизация")
 
-    if user := await get_user_by_token(cookies.refresh_token, "refresh", db, rd):
-        await rd.delete(cookies.refresh_token)
-        return await create_user_tokens(UserResponse.model_validate(user), rd, response)
-
-    raise HTTPException(status.HTTP_403_FORBIDDEN, "Токен не найден")
+    return await rotate_user_tokens(cookies.refresh_token, db, rd, response)
 
 
 @router.delete(
     "/",
+    dependencies=[use_bulkhead("auth")],
     summary="Выйти из аккаунта",
     response_description="Пустой ответ: успешный выход из аккаунта",
     status_code=status.HTTP_204_NO_CONTENT,
@@ -93,3 +99,27 @@ async def logout(
     response.status_code = status.HTTP_204_NO_CONTENT
 
     return response
+
+
+@router.delete(
+    "/sessions",
+    dependencies=[use_bulkhead("auth")],
+    summary="Выйти из аккаунта на всех устройствах",
+    response_description="Пустой ответ: все сессии пользователя завершены",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def logout_everywhere(
+    authorized_user: auth_dep,
+    response: Response,
+    db: db_dep,
+    rd: rd_dep,
+) -> Response:
+    await UserDAL.revoke_sessions(authorized_user.id, db)
+    await revoke_sessions_after_write(authorized_user.id, rd)
+    logger.info("User %s logged out from all sessions", authorized_user.id)
+
+    response.delete_cookie("access_token")
+    response.delete_cookie("refresh_token")
+    response.status_code = status.HTTP_204_NO_CONTENT
+
+    return response
@@ -3,23 +3,28 @@
 import logging
 from typing import Annotated
 
-from fastapi import APIRouter, HTTPException, Response, status
+from fastapi import APIRouter, HTTPException, status
 from sqlalchemy.exc import IntegrityError
 
 from social_network_api.api.dependencies import (
     auth_dep,
+    cached_reader_dep,
     comment_dep,
     db_dep,
     find_rule_info,
     post_dep,
+    use_bulkhead,
 )
+from social_network_api.db.cache import response_cache
 from social_network_api.db.dal import CommentDAL
 from social_network_api.schemas import CommentCreate, CommentResponse, CommentUpdate, RuleInfo
 from social_network_api.utils.access import check_rule, choose_rule
+from social_network_api.utils.timing import TimedRoute
 
 logger = logging.getLogger("social_network_api")
 router = APIRouter(
     prefix="/comments",
+    route_class=TimedRoute,
     tags=["Управление комментариями"],
     responses={
         status.HTTP_404_NOT_FOUND: {"description": "Комментарий не найден"},
@@ -29,6 +34,7 @@ router = APIRouter(
 
 @router.post(
     "/",
+    dependencies=[use_bulkhead("writes")],
     summary="Создать комментарий",
     response_description="Информация о комментарие: комментарий успешно создан",
 )
@@ -48,27 +54,30 @@ async def create_comment(
         logger.exception("Нарушение ограничений данных при создании комментария")
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Нарушение ограничений данных")
     else:
+        response_cache.invalidate("users", "posts", "comments")
         check_rule(choose_rule(comment, authorized_user, getting_rule_info))
         return CommentResponse.model_validate(comment)
 
 
 @router.get(
     "/",
+    dependencies=[use_bulkhead("list_reads")],
     summary="Получить все комментарии",
     response_description="Информация о комментариях: список успешно сформирован",
 )
 async def get_all_comments(
     rule_info: Annotated[RuleInfo, find_rule_info("comments", "read")],
-    db: db_dep,
+    cached_reader: cached_reader_dep,
 ) -> list[CommentResponse]:
     check_rule(rule_info.alien_rule)
-    comments = await CommentDAL.get_all(db)
+    comments = await cached_reader(("comments", "all"), CommentDAL.get_all)
 
     return [CommentResponse.model_validate(comment) for comment in comments]
 
 
 @router.get(
     "/{comment_id}",
+    dependencies=[use_bulkhead("single_reads")],
     summary="Получить комментарий",
     response_description="Информация о комментарие: комментарий успешно найден",
 )
@@ -84,6 +93,7 @@ async def get_comment(
 
 @router.patch(
     "/{comment_id}",
+    dependencies=[use_bulkhead("writes")],
     summary="Обновить комментарий",
     response_description="Информация о комментарие: комментарий успешно обновлён",
 )
@@ -102,12 +112,14 @@ async def update_comment(
     except IntegrityError:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Нарушение ограничений данных")
     else:
+        response_cache.invalidate("users", "posts", "comments")
         check_rule(choose_rule(comment, authorized_user, getting_rule_info))
         return CommentResponse.model_validate(comment)
 
 
 @router.delete(
     "/{comment_id}",
+    dependencies=[use_bulkhead("writes")],
     summary="Удалить комментарий",
     status_code=status.HTTP_204_NO_CONTENT,
     response_description="Пустой ответ: комментарий успешно удалён",
@@ -117,7 +129,7 @@ async def delete_comment(
     db: db_dep,
     authorized_user: auth_dep,
     rule_info: Annotated[RuleInfo, find_rule_info("comments", "delete")],
-) -> Response:
+) -> None:
     check_rule(choose_rule(comment, authorized_user, rule_info))
 
     try:
@@ -125,4 +137,4 @@ async def delete_comment(
     except IntegrityError:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Нарушение ограничений данных")
     else:
-        return Response(status_code=status.HTTP_204_NO_CONTENT)
+        response_cache.invalidate("users", "posts", "comments")
@@ -0,0 +1,161 @@
+"""Эндпоинты диагностики производительности и памяти воркера для администраторов."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import tracemalloc
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, HTTPException, Query, Response, status
+from fastapi.responses import PlainTextResponse
+
+from social_network_api.api.dependencies import admin_dep
+from social_network_api.schemas import (
+    AllocationDiffResponse,
+    AllocationStatResponse,
+    MemorySnapshotResponse,
+    MemoryStatusResponse,
+    OrmObjectsResponse,
+    config,
+)
+from social_network_api.utils.memory import memory_diagnostics, orm_objects
+from social_network_api.utils.profiler import render_flamegraph, sampling_profiler
+from social_network_api.utils.timing import TimedRoute
+
+logger = logging.getLogger("social_network_api")
+router = APIRouter(
+    prefix="/diagnostics",
+    route_class=TimedRoute,
+    tags=["Диагностика"],
+    responses={
+        status.HTTP_403_FORBIDDEN: {"description": "Доступ только для администраторов"},
+    },
+)
+
+
+@router.get(
+    "/profile",
+    summary="Получить профиль воркера за последние минуты",
+    response_description="Свёрнутые стеки (collapsed) или flame graph в формате SVG",
+    response_class=PlainTextResponse,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Непрерывное профилирование отключено"},
+    },
+)
+async def get_profile(
+    _: admin_dep,
+    minutes: Annotated[int, Query(ge=1, le=config.monitoring.sampling_window_minutes)] = 5,
+    output: Literal["collapsed", "flamegraph"] = "collapsed",
+    route: Annotated[str | None, Query(description="Например GET /users/{user_id}")] = None,
+) -> Response:
+    if not config.monitoring.sampling_enabled:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Непрерывное профилирование отключено")
+
+    # Сборка и отрисовка занимают заметное время, поэтому выполняются вне цикла событий
+    folded = await asyncio.to_thread(sampling_profiler.folded, minutes, route)
+
+    if output == "collapsed":
+        return PlainTextResponse("\n".join(folded) + "\n")
+
+    svg = await asyncio.to_thread(render_flamegraph, folded, f"Последние {minutes} мин")
+    return Response(svg, media_type="image/svg+xml")
+
+
+@router.get(
+    "/memory",
+    summary="Получить состояние tracemalloc",
+    response_description="Память, отслеживаемая tracemalloc, и сохранённые снимки",
+)
+async def get_memory_status(_: admin_dep) -> MemoryStatusResponse:
+    return MemoryStatusResponse.model_validate(memory_diagnostics.status())
+
+
+@router.post(
+    "/memory/tracemalloc/start",
+    summary="Запустить tracemalloc",
+    response_description="Состояние tracemalloc: пока он запущен, выделение памяти медленнее",
+)
+async def start_tracemalloc(
+    _: admin_dep,
+    frames: Annotated[int, Query(ge=1, le=100)] = config.monitoring.memory_trace_frames,
+) -> MemoryStatusResponse:
+    memory_diagnostics.start(frames)
+    return MemoryStatusResponse.model_validate(memory_diagnostics.status())
+
+
+@router.post(
+    "/memory/tracemalloc/stop",
+    summary="Остановить tracemalloc",
+    response_description="Состояние tracemalloc: снимки удалены",
+)
+async def stop_tracemalloc(_: admin_dep) -> MemoryStatusResponse:
+    memory_diagnostics.stop()
+    return MemoryStatusResponse.model_validate(memory_diagnostics.status())
+
+
+@router.post(
+    "/memory/snapshots",
+    summary="Сделать снимок памяти",
+    response_description="Снимок памяти сохранён",
+    responses={
+        status.HTTP_409_CONFLICT: {"description": "tracemalloc не запущен"},
+    },
+)
+async def take_memory_snapshot(_: admin_dep) -> MemorySnapshotResponse:
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status.HTTP_409_CONFLICT, "tracemalloc не запущен")
+
+    return MemorySnapshotResponse.model_validate(await memory_diagnostics.take_snapshot())
+
+
+@router.get(
+    "/memory/snapshots/{snapshot_id}",
+    summary="Получить строки кода, удерживающие больше всего памяти в снимке",
+    response_description="Строки кода по убыванию удерживаемой памяти",
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Снимок не найден"},
+    },
+)
+async def get_memory_snapshot(
+    _: admin_dep,
+    snapshot_id: int,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 50,
+) -> list[AllocationStatResponse]:
+    try:
+        stats = await memory_diagnostics.top(snapshot_id, limit)
+    except LookupError as e:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, str(e))
+
+    return [AllocationStatResponse.model_validate(stat) for stat in stats]
+
+
+@router.get(
+    "/memory/snapshots/{first_id}/diff/{second_id}",
+    summary="Сравнить два снимка памяти по строкам кода",
+    response_description="Строки кода по убыванию роста памяти от первого снимка ко второму",
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Снимок не найден"},
+    },
+)
+async def diff_memory_snapshots(
+    _: admin_dep,
+    first_id: int,
+    second_id: int,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 50,
+) -> list[AllocationDiffResponse]:
+    try:
+        stats = await memory_diagnostics.diff(first_id, second_id, limit)
+    except LookupError as e:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, str(e))
+
+    return [AllocationDiffResponse.model_validate(stat) for stat in stats]
+
+
+@router.get(
+    "/memory/orm",
+    summary="Получить количество объектов моделей в памяти",
+    response_description="Объекты моделей в памяти процесса и в identity map открытых сессий",
+)
+async def get_orm_objects(_: admin_dep) -> OrmObjectsResponse:
+    return OrmObjectsResponse.model_validate(orm_objects())
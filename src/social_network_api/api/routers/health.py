@@ -0,0 +1,46 @@
+"""Эндпоинты, отвечающие за проверку состояния сервиса."""
+
+from __future__ import annotations
+
+import logging
+
+from fastapi import APIRouter
+
+from social_network_api.api.dependencies import bulkheads
+from social_network_api.api.middlewares import concurrency_limiter
+from social_network_api.db.connection import pool_stats, redis_breaker
+from social_network_api.schemas import (
+    BulkheadStatsResponse,
+    CircuitBreakerStats,
+    HealthResponse,
+    LimiterStatsResponse,
+    PoolStatsResponse,
+)
+from social_network_api.utils.timing import TimedRoute
+
+logger = logging.getLogger("social_network_api")
+router = APIRouter(
+    prefix="/health",
+    route_class=TimedRoute,
+    tags=["Состояние сервиса"],
+)
+
+
+@router.get(
+    "/",
+    summary="Получить состояние сервиса",
+    response_description="Состояние сервиса: degraded, если Redis недоступен и вход невозможен",
+)
+async def get_health() -> HealthResponse:
+    redis_stats = CircuitBreakerStats.model_validate(redis_breaker.stats())
+
+    return HealthResponse(
+        status="ok" if redis_stats.state == "closed" else "degraded",
+        redis=redis_stats,
+        database=PoolStatsResponse.model_validate(pool_stats.snapshot()),
+        limiter=LimiterStatsResponse.model_validate(concurrency_limiter.stats()),
+        bulkheads={
+            name: BulkheadStatsResponse.model_validate(bulkhead.stats())
+            for name, bulkhead in bulkheads.items()
+        },
+    )
@@ -0,0 +1,112 @@
+"""Эндпоинт с метриками приложения для Prometheus."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge
+
+from social_network_api.api.dependencies import bulkheads
+from social_network_api.api.middlewares import concurrency_limiter
+from social_network_api.db.connection import pool_stats, redis_breaker
+from social_network_api.utils.metrics import add_collector, render, run_collectors, set_total
+from social_network_api.utils.timing import TimedRoute
+
+logger = logging.getLogger("social_network_api")
+router = APIRouter(
+    route_class=TimedRoute,
+    tags=["Состояние сервиса"],
+)
+
+db_pool_connections = Gauge(
+    "db_pool_connections",
+    "Соединения пула PostgreSQL: size - открытые в основном пуле, overflow - дополнительные, "
+    "in_use - выданные запросам",
+    ("state",),
+    multiprocess_mode="livesum",
+)
+db_pool_events = Counter(
+    "db_pool_events_total",
+    "События пула PostgreSQL: выдачи соединений, таймауты ожидания, открытия и инвалидации",
+    ("event",),
+)
+concurrency_limit = Gauge(
+    "concurrency_limit",
+    "Текущий адаптивный лимит одновременных запросов",
+    multiprocess_mode="livesum",
+)
+concurrency_in_flight = Gauge(
+    "concurrency_in_flight",
+    "Запросы, занимающие место в адаптивном лимите",
+    multiprocess_mode="livesum",
+)
+concurrency_rejected = Counter(
+    "concurrency_rejected_total",
+    "Запросы, отклонённые адаптивным лимитом, по приоритету",
+    ("priority",),
+)
+bulkhead_in_use = Gauge(
+    "bulkhead_in_use",
+    "Занятые места в семафоре класса эндпоинтов",
+    ("bulkhead",),
+    multiprocess_mode="livesum",
+)
+bulkhead_rejected = Counter(
+    "bulkhead_rejected_total",
+    "Запросы, не дождавшиеся места в семафоре класса эндпоинтов",
+    ("bulkhead",),
+)
+circuit_breaker_state = Gauge(
+    "circuit_breaker_state",
+    "Количество воркеров, в которых прерыватель цепи внешнего сервиса в указанном состоянии",
+    ("service", "state"),
+    multiprocess_mode="livesum",
+)
+
+
+def _collect_stats() -> None:
+    pool = pool_stats.snapshot()
+
+    for state in ("size", "overflow", "in_use"):
+        db_pool_connections.labels(state).set(pool[state])
+
+    for event, key in (
+        ("checkout", "checkouts_total"),
+        ("checkout_timeout", "checkout_timeouts_total"),
+        ("connect", "connections_opened_total"),
+        ("invalidate", "connections_invalidated_total"),
+    ):
+        set_total(db_pool_events, pool[key], event=event)
+
+    limiter = concurrency_limiter.stats()
+    concurrency_limit.set(limiter["limit"])
+    concurrency_in_flight.set(limiter["in_flight"])
+    set_total(concurrency_rejected, limiter["rejected_auth_total"], priority="auth")
+    set_total(concurrency_rejected, limiter["rejected_default_total"], priority="default")
+
+    for name, bulkhead in bulkheads.items():
+        stats = bulkhead.stats()
+        bulkhead_in_use.labels(name).set(stats["in_use"])
+        set_total(bulkhead_rejected, stats["rejected_total"], bulkhead=name)
+
+    for state in ("closed", "open", "half_open"):
+        circuit_breaker_state.labels(redis_breaker.name, state).set(
+            int(redis_breaker.state == state)
+        )
+
+
+add_collector(_collect_stats)
+
+
+@router.get(
+    "/metrics",
+    summary="Получить метрики сервиса",
+    response_description="Метрики всех воркеров в текстовом формате Prometheus",
+    response_class=Response,
+)
+async def get_metrics() -> Response:
+    run_collectors()
+
+    return Response(await asyncio.to_thread(render), media_type=CONTENT_TYPE_LATEST)
@@ -3,17 +3,27 @@
 import logging
 from typing import Annotated
 
-from fastapi import APIRouter, HTTPException, Response, status
+from fastapi import APIRouter, HTTPException, status
 from sqlalchemy.exc import IntegrityError
 
-from social_network_api.api.dependencies import auth_dep, db_dep, find_rule_info, post_dep
+from social_network_api.api.dependencies import (
+    auth_dep,
+    cached_reader_dep,
+    db_dep,
+    find_rule_info,
+    post_dep,
+    use_bulkhead,
+)
+from social_network_api.db.cache import response_cache
 from social_network_api.db.dal import PostDAL
 from social_network_api.schemas import PostCreate, PostResponse, PostUpdate, RuleInfo
 from social_network_api.utils.access import check_rule, choose_rule
+from social_network_api.utils.timing import TimedRoute
 
 logger = logging.getLogger("social_network_api")
 router = APIRouter(
     prefix="/posts",
+    route_class=TimedRoute,
     tags=["Управление постами"],
     responses={
         status.HTTP_404_NOT_FOUND: {"description": "Пост не найден"},
@@ -23,6 +33,7 @@ router = APIRouter(
 
 @router.post(
     "/",
+    dependencies=[use_bulkhead("writes")],
     summary="Создать пост",
     response_description="Информация о посте: пост успешно создан",
 )
@@ -40,27 +51,30 @@ async def create_post(
     except IntegrityError:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Нарушение ограничений данных")
     else:
+        response_cache.invalidate("users", "posts", "comments")
         check_rule(choose_rule(post, authorized_user, getting_rule_info))
         return PostResponse.model_validate(post)
 
 
 @router.get(
     "/",
+    dependencies=[use_bulkhead("list_reads")],
     summary="Получить все посты",
     response_description="Информация о постах: список успешно сформирован",
 )
 async def get_all_posts(
     rule_info: Annotated[RuleInfo, find_rule_info("posts", "read")],
-    db: db_dep,
+    cached_reader: cached_reader_dep,
 ) -> list[PostResponse]:
     check_rule(rule_info.alien_rule)
-    posts = await PostDAL.get_all(db)
+    posts = await cached_reader(("posts", "all"), PostDAL.get_all)
 
     return [PostResponse.model_validate(post) for post in posts]
 
 
 @router.get(
     "/{post_id}",
+    dependencies=[use_bulkhead("single_reads")],
     summary="Получить пост",
     response_description="Информация о посте: пост успешно найден",
 )
@@ -76,6 +90,7 @@ async def get_post(
 
 @router.patch(
     "/{post_id}",
+    dependencies=[use_bulkhead("writes")],
     summary="Обновить пост",
     response_description="Информация о посте: пост успешно обновлён",
 )
@@ -94,12 +109,14 @@ async def update_post(
     except IntegrityError:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Нарушение ограничений данных")
     else:
+        response_cache.invalidate("users", "posts", "comments")
         check_rule(choose_rule(post, authorized_user, getting_rule_info))
         return PostResponse.model_validate(post)
 
 
 @router.delete(
     "/{post_id}",
+    dependencies=[use_bulkhead("writes")],
     summary="Удалить пост",
     status_code=status.HTTP_204_NO_CONTENT,
     response_description="Пустой ответ: пост успешно удалён",
@@ -109,7 +126,7 @@ async def delete_post(
     authorized_user: auth_dep,
     rule_info: Annotated[RuleInfo, find_rule_info("posts", "delete")],
     db: db_dep,
-) -> Response:
+) -> None:
     check_rule(choose_rule(post, authorized_user, rule_info))
 
     try:
@@ -117,4 +134,4 @@ async def delete_post(
     except IntegrityError:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Нарушение ограничений данных")
     else:
-        return Response(status_code=status.HTTP_204_NO_CONTENT)
+        response_cache.invalidate("users", "posts", "comments")
@@ -6,14 +6,23 @@ from typing import Annotated
 from fastapi import APIRouter, HTTPException, status
 from sqlalchemy.exc import IntegrityError
 
-from social_network_api.api.dependencies import db_dep, find_rule_info, role_rule_dep
+from social_network_api.api.dependencies import (
+    cached_reader_dep,
+    db_dep,
+    find_rule_info,
+    role_rule_dep,
+    use_bulkhead,
+)
+from social_network_api.db.cache import response_cache
 from social_network_api.db.dal import RoleRuleDAL
 from social_network_api.schemas import RoleRuleGet, RoleRuleResponse, RoleRuleUpdate, RuleInfo
 from social_network_api.utils.access import check_rule
+from social_network_api.utils.timing import TimedRoute
 
 logger = logging.getLogger("social_network_api")
 router = APIRouter(
     prefix="/role-rules",
+    route_class=TimedRoute,
     tags=["Управление правилами ролей"],
     responses={
         status.HTTP_404_NOT_FOUND: {"description": "Правило роли не найдено"},
@@ -25,6 +34,7 @@ router = APIRouter(
 
 @router.get(
     "/{role}/{object_type}/{action}/{owned}",
+    dependencies=[use_bulkhead("single_reads")],
     summary="Получить правило роли",
     response_description="Информация о правиле роли: правило роли успешно найдено",
 )
@@ -38,21 +48,23 @@ async def get_role_rule(
 
 @router.get(
     "/",
+    dependencies=[use_bulkhead("list_reads")],
     summary="Получить все правила ролей",
     response_description="Информация о правилах ролей: список успешно сформирован",
 )
 async def get_all_role_rules(
     rule_info: Annotated[RuleInfo, find_rule_info("users", "read")],
-    db: db_dep,
+    cached_reader: cached_reader_dep,
 ) -> list[RoleRuleResponse]:
     check_rule(rule_info.alien_rule)
-    role_rules = await RoleRuleDAL.get_all(db)
+    role_rules = await cached_reader(("role_rules", "all"), RoleRuleDAL.get_all)
 
     return [RoleRuleResponse.model_validate(role_rule) for role_rule in role_rules]
 
 
 @router.patch(
     "/{role}/{object_type}/{action}/{owned}",
+    dependencies=[use_bulkhead("writes")],
     summary="Обновить правило роли",
     response_description="Информация о правиле роли: правило роли успешно обновлёно",
 )
@@ -70,5 +82,6 @@ async def update_role_rule(
     except IntegrityError:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Нарушение ограничений данных")
     else:
+        response_cache.invalidate("role_rules")
         check_rule(getting_rule_info.alien_rule)
         return RoleRuleResponse.model_validate(role_rule)
@@ -3,16 +3,21 @@
 import logging
 from typing import Annotated
 
-from fastapi import APIRouter, HTTPException, Query, Response, status
+from fastapi import APIRouter, HTTPException, Query, status
 from sqlalchemy.exc import IntegrityError
 
 from social_network_api.api.dependencies import (
     auth_dep,
+    cached_reader_dep,
     db_dep,
     find_rule_info,
     optional_auth_dep,
+    rd_dep,
+    use_bulkhead,
     user_dep,
 )
+from social_network_api.db.bloom import email_filter
+from social_network_api.db.cache import response_cache
 from social_network_api.db.dal import UserDAL
 from social_network_api.schemas import (
     USER_INCLUDE_TYPE,
@@ -23,10 +28,13 @@ from social_network_api.schemas import (
     UserUpdate,
 )
 from social_network_api.utils.access import check_rule, choose_rule
+from social_network_api.utils.auth import revoke_sessions_after_write
+from social_network_api.utils.timing import TimedRoute
 
 logger = logging.getLogger("social_network_api")
 router = APIRouter(
     prefix="/users",
+    route_class=TimedRoute,
     tags=["Управление пользователями"],
     responses={
         status.HTTP_404_NOT_FOUND: {"description": "Пользователь не найден"},
@@ -36,6 +44,7 @@ router = APIRouter(
 
 @router.post(
     "/",
+    dependencies=[use_bulkhead("writes")],
     summary="Создать пользователя",
     response_description="Информация о пользователе: пользователь успешно создан",
 )
@@ -43,16 +52,25 @@ async def create(
     user_info: UserCreate,
     authorized_user: optional_auth_dep,
     db: db_dep,
+    rd: rd_dep,
     create_rule_info: Annotated[RuleInfo, find_rule_info("users", "create")],
     getting_rule_info: Annotated[RuleInfo, find_rule_info("users", "read")],
 ) -> UserResponse | UserFullResponse:
     check_rule(create_rule_info.alien_rule if authorized_user else create_rule_info.owned_rule)
 
+    # Проверка до хеширования пароля, отрицательный ответ фильтра позволяет не обращаться к БД
+    if await email_filter.might_contain(user_info.email, rd) and await UserDAL.exists_with_email(
+        user_info.email, db
+    ):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Нарушение ограничений данных")
+
     try:
         user = await UserDAL.create(user_info, db)
     except IntegrityError:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Нарушение ограничений данных")
     else:
+        await email_filter.add(user.email, rd)
+        response_cache.invalidate("users", "posts", "comments")
         return (
             UserFullResponse
             if check_rule(choose_rule(user, user, getting_rule_info)).full_access
@@ -62,16 +80,17 @@ async def create(
 
 @router.get(
     "/",
+    dependencies=[use_bulkhead("list_reads")],
     summary="Получить всех пользователей",
     response_description="Информация о пользователе: пользователь успешно найден",
 )
 async def get_all_users(
     rule_info: Annotated[RuleInfo, find_rule_info("users", "read")],
-    db: db_dep,
+    cached_reader: cached_reader_dep,
     include: tuple[USER_INCLUDE_TYPE, ...] = Query(default=()),
 ) -> list[UserResponse | UserFullResponse]:
     check_rule(rule_info.alien_rule)
-    users = await UserDAL.get_all(db, include)
+    users = await cached_reader(("users", "all", *include), lambda db: UserDAL.get_all(db, include))
 
     return [
         (UserFullResponse if rule_info.alien_rule.full_access else UserResponse).model_validate(
@@ -83,18 +102,22 @@ async def get_all_users(
 
 @router.get(
     "/me",
+    dependencies=[use_bulkhead("single_reads")],
     summary="Получить своего пользователя",
     response_description="Информация о пользователях: список успешно сформирован",
 )
 async def get_user(
     authorized_user: auth_dep,
-    db: db_dep,
+    cached_reader: cached_reader_dep,
     rule_info: Annotated[RuleInfo, find_rule_info("users", "read")],
     include: tuple[USER_INCLUDE_TYPE, ...] = Query(default=()),
 ) -> UserFullResponse | UserResponse:
     check_rule(rule_info.owned_rule)  # Используется owned_rule так как это всегда сам пользователь
 
-    user = await UserDAL.get_by_id(authorized_user.id, db, include)
+    user = await cached_reader(
+        ("users", authorized_user.id, *include),
+        lambda db: UserDAL.get_by_id(authorized_user.id, db, include),
+    )
     return (UserFullResponse if rule_info.owned_rule.full_access else UserResponse).model_validate(
         user
     )
@@ -102,6 +125,7 @@ async def get_user(
 
 @router.get(
     "/{user_id}",
+    dependencies=[use_bulkhead("single_reads")],
     summary="Получить любого пользователя",
     response_description="Информация о пользователе: пользователь успешно найден",
 )
@@ -109,12 +133,16 @@ async def get_any_user(
     user: user_dep,
     authorized_user: auth_dep,
     rule_info: Annotated[RuleInfo, find_rule_info("users", "read")],
-    db: db_dep,
+    cached_reader: cached_reader_dep,
     include: tuple[USER_INCLUDE_TYPE, ...] = Query(default=()),
 ) -> UserResponse | UserFullResponse:
     check_rule(choose_rule(user, authorized_user, rule_info))
 
-    user = await UserDAL.get_by_id(user.id, db, include)
+    user_id = user.id
+    user = await cached_reader(
+        ("users", user_id, *include),
+        lambda db: UserDAL.get_by_id(user_id, db, include),
+    )
     return (UserFullResponse if rule_info.owned_rule.full_access else UserResponse).model_validate(
         user
     )
@@ -122,6 +150,7 @@ async def get_any_user(
 
 @router.patch(
     "/{user_id}",
+    dependencies=[use_bulkhead("writes")],
     summary="Обновить любого пользователя",
     response_description="Информация о пользователе: пользователь успешно обновлён",
 )
@@ -132,6 +161,7 @@ async def update_user(
     update_rule_info: Annotated[RuleInfo, find_rule_info("users", "update")],
     getting_rule_info: Annotated[RuleInfo, find_rule_info("users", "read")],
     db: db_dep,
+    rd: rd_dep,
 ) -> UserResponse | UserFullResponse:
     check_rule(choose_rule(user, authorized_user, update_rule_info))
 
@@ -140,6 +170,13 @@ async def update_user(
     except IntegrityError:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Нарушение ограничений данных")
     else:
+        if update_info.email:
+            await email_filter.add(user.email, rd)
+
+        response_cache.invalidate("users", "posts", "comments")
+
+        if update_info.role:  # Сессии со старой ролью завершаются
+            await revoke_sessions_after_write(user.id, rd)
         suitable_rule = choose_rule(user, authorized_user, getting_rule_info)
         check_rule(suitable_rule)
 
@@ -150,6 +187,7 @@ async def update_user(
 
 @router.delete(
     "/{user_id}",
+    dependencies=[use_bulkhead("writes")],
     summary="Удалить любого пользователя безопасно или вместе с данными",
     status_code=status.HTTP_204_NO_CONTENT,
     response_description="Пустой ответ: пользователь успешно удалён",
@@ -158,9 +196,10 @@ async def delete_any_user(
     user: user_dep,
     authorized_user: auth_dep,
     db: db_dep,
+    rd: rd_dep,
     rule_info: Annotated[RuleInfo, find_rule_info("users", "delete")],
     hard_delete: bool = Query(default=False),
-) -> Response:
+) -> None:
     suitable_rule = choose_rule(user, authorized_user, rule_info)
     check_rule(suitable_rule)
 
@@ -173,4 +212,5 @@ async def delete_any_user(
     except IntegrityError:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Нарушение ограничений данных")
     else:
-        return Response(status_code=status.HTTP_204_NO_CONTENT)
+        response_cache.invalidate("users", "posts", "comments")
+        await revoke_sessions_after_write(user.id, rd)
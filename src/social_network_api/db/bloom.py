@@ -0,0 +1,183 @@
+"""Модуль с фильтром Блума для email зарегистрированных пользователей."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from typing import TYPE_CHECKING
+
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+
+from social_network_api.db.connection import (
+    CircuitOpenError,
+    redis_breaker,
+    redis_pipeline,
+    session_maker,
+)
+from social_network_api.db.dal import UserDAL
+from social_network_api.schemas import config
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger("social_network_api")
+
+# Сколько email, не записанных в фильтр при недоступности Redis, воркер помнит сам
+MAX_PENDING_EMAILS = 10000
+# Максимальная пауза между попытками записать их после недоступности Redis
+RECOVERY_MAX_DELAY_SECONDS = 60.0
+
+
+class EmailBloomFilter:
+    """Фильтр Блума в Redis для быстрой проверки, что email точно не зарегистрирован.
+
+    Email сравниваются без учёта регистра, как и в базе данных.
+    Биты хранятся в одной битовой строке Redis, поэтому фильтр общий для всех воркеров.
+    Отрицательный ответ точен, положительный требует проверки в базе данных.
+    Пока фильтр не построен (нет ключа готовности), любой email считается возможно существующим.
+
+    Удалённые пользователи и старые email не удаляются из фильтра, а только увеличивают
+    вероятность ложноположительного ответа. Email, которые не удалось записать при
+    недоступности Redis, считаются существующими в этом воркере (а при переполнении списка -
+    любые email). Фоновая задача дожидается Redis, удаляет ключ готовности, чтобы остальные
+    воркеры тоже проверяли email в базе данных, и перестраивает фильтр.
+    """
+
+    def __init__(self, key: str, size_bits: int, hash_count: int, rebuild_interval: int) -> None:
+        self.key = key
+        self.size_bits = size_bits
+        self.hash_count = hash_count
+        self.rebuild_interval = rebuild_interval
+
+        self._ready_key = f"{key}:ready"
+        self._lock_key = f"{key}:lock"
+        self._pending: set[str] = set()
+        self._pending_overflow = False
+        self._recovery: asyncio.Task[None] | None = None
+
+    async def add(self, email: str, rd: Redis) -> None:
+        try:
+            async with redis_pipeline(rd) as pipe:
+                for offset in self._offsets(email):
+                    pipe.setbit(self.key, offset, 1)
+                await pipe.execute()
+        except RedisError as exc:
+            if not isinstance(exc, CircuitOpenError):
+                logger.warning("Не удалось добавить email в фильтр Блума", exc_info=True)
+
+            if len(self._pending) < MAX_PENDING_EMAILS:
+                self._pending.add(email.lower())
+            else:
+                self._pending_overflow = True
+
+            if self._recovery is None or self._recovery.done():
+                self._recovery = asyncio.create_task(self._recover(rd))
+
+    async def might_contain(self, email: str, rd: Redis) -> bool:
+        if self._pending_overflow or email.lower() in self._pending:
+            return True
+
+        try:
+            async with redis_pipeline(rd) as pipe:
+                pipe.exists(self._ready_key)
+                for offset in self._offsets(email):
+                    pipe.getbit(self.key, offset)
+                ready, *bits = await pipe.execute()
+        except CircuitOpenError:
+            return True
+        except RedisError:
+            logger.warning("Фильтр Блума недоступен, проверка выполняется в БД", exc_info=True)
+            return True
+
+        return not ready or all(bits)
+
+    async def rebuild(self, session: AsyncSession, rd: Redis) -> None:
+        """Записывает в фильтр все email из базы данных.
+
+        Установка битов идемпотентна, поэтому перестроение идёт прямо в рабочий ключ
+        и не теряет email, добавленные одновременно с ним.
+        """
+        async for emails in UserDAL.iter_emails(session):
+            async with redis_pipeline(rd) as pipe:
+                for email in emails:
+                    for offset in self._offsets(email):
+                        pipe.setbit(self.key, offset, 1)
+                await pipe.execute()
+
+        async with redis_breaker:
+            await rd.set(self._ready_key, "1", ex=self.rebuild_interval * 2)
+        logger.info("Фильтр Блума email пользователей перестроен")
+
+    async def run_rebuilds(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        rd: Redis,
+    ) -> None:
+        """Периодически перестраивает фильтр, из всех воркеров это делает только один."""
+        while True:
+            try:
+                async with redis_breaker:
+                    locked = await rd.set(self._lock_key, "1", nx=True, ex=self.rebuild_interval)
+
+                if locked:
+                    async with session_maker() as session:
+                        await self.rebuild(session, rd)
+            except (RedisError, SQLAlchemyError, OSError):
+                logger.exception("Не удалось перестроить фильтр Блума")
+
+            await asyncio.sleep(self.rebuild_interval)
+
+    async def _recover(self, rd: Redis) -> None:
+        # Другие воркеры не знают о незаписанных email и дали бы для них ложноотрицательный
+        # ответ, поэтому вместе с записью удаляется ключ готовности, а перестроение из базы
+        # данных возвращает его. Email, не записанные во время перестроения, повторяют цикл
+        while self._pending or self._pending_overflow:
+            emails, overflow = list(self._pending), self._pending_overflow
+            delay = 1.0
+
+            while True:
+                try:
+                    async with redis_pipeline(rd) as pipe:
+                        pipe.delete(self._ready_key)
+                        for email in emails:
+                            for offset in self._offsets(email):
+                                pipe.setbit(self.key, offset, 1)
+                        await pipe.execute()
+                except RedisError:
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, RECOVERY_MAX_DELAY_SECONDS)
+                else:
+                    break
+
+            self._pending.difference_update(emails)
+
+            if overflow:
+                self._pending_overflow = False
+
+            try:
+                async with session_maker() as session:
+                    await self.rebuild(session, rd)
+            except (RedisError, SQLAlchemyError, OSError):
+                # Без ключа готовности все воркеры проверяют email в базе данных
+                # до следующего периодического перестроения
+                logger.exception("Не удалось перестроить фильтр Блума после ошибки записи")
+                return
+
+    def _offsets(self, email: str) -> list[int]:
+        # Двойное хеширование: k позиций получаются из двух независимых половин одного хеша
+        digest = hashlib.blake2b(email.lower().encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+
+        return [(first + i * second) % self.size_bits for i in range(self.hash_count)]
+
+
+email_filter = EmailBloomFilter(
+    key="users:email_bloom",
+    size_bits=config.cache.email_filter_size_bits,
+    hash_count=config.cache.email_filter_hash_count,
+    rebuild_interval=config.cache.email_filter_rebuild_seconds,
+)
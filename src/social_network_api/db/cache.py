@@ -0,0 +1,248 @@
+"""Модуль для кеширования и объединения одинаковых запросов к базе данных."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, cast
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from social_network_api.db.connection import read_session_maker
+from social_network_api.schemas import config
+from social_network_api.utils.metrics import cache_requests
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Hashable
+
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger("social_network_api")
+
+
+class SingleFlight:
+    """Объединяет одновременные запросы с одинаковым ключом в один вызов.
+
+    Первый запрос с ключом выполняет загрузку, а остальные, пришедшие до её завершения,
+    получают тот же результат (или то же исключение) без повторного обращения к базе данных.
+    Работает в пределах одного процесса.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Task[Any]] = {}
+
+    async def run[T](self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        if (task := self._calls.get(key)) is None:
+            task = asyncio.ensure_future(loader())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            logger.debug("Запрос %s объединён с уже выполняющимся", key)
+
+        # shield не даёт отмене одного из ожидающих запросов прервать загрузку для остальных
+        return cast("T", await asyncio.shield(task))
+
+    def _forget(self, key: Hashable, task: asyncio.Task[Any]) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+        # Исключение уже получено ожидающими, здесь оно извлекается во избежание предупреждений
+        if not task.cancelled():
+            task.exception()
+
+
+single_flight = SingleFlight()
+
+
+class NegativeCache:
+    """Кеш ключей, для которых объект не был найден в базе данных.
+
+    Позволяет не обращаться к базе данных при повторных запросах несуществующих объектов.
+    Ключи хранятся не дольше ttl и удаляются при создании соответствующего объекта.
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._expires_at: OrderedDict[Hashable, float] = OrderedDict()
+        # Увеличивается при удалении ключей, чтобы промахи, полученные до создания объекта,
+        # не попали в кеш после него
+        self.generation = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Проверяет, что ключ отмечен отсутствующим и время его хранения не истекло."""
+        if (expires_at := self._expires_at.get(key)) is None:
+            return False
+
+        if expires_at > time.monotonic():
+            return True
+
+        del self._expires_at[key]
+        return False
+
+    def add(self, key: Hashable, generation: int) -> None:
+        if generation != self.generation:
+            return
+
+        self._expires_at[key] = time.monotonic() + self.ttl
+        self._expires_at.move_to_end(key)
+
+        while len(self._expires_at) > self.max_entries:
+            self._expires_at.popitem(last=False)
+
+    def discard(self, *keys: Hashable) -> None:
+        self.generation += 1
+
+        for key in keys:
+            self._expires_at.pop(key, None)
+
+    def discard_matching(self, predicate: Callable[[Any], bool]) -> None:
+        self.discard(*[key for key in self._expires_at if predicate(key)])
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    """Значение в кеше и время его загрузки."""
+
+    value: Any
+    loaded_at: float
+
+
+@dataclass(slots=True)
+class CacheResult[T]:
+    """Результат чтения из кеша с информацией об устаревании."""
+
+    value: T
+    age: float
+    stale: bool
+
+
+class StaleCache:
+    """Кеш объектов с мягким и жёстким временем жизни.
+
+    Ключом является кортеж, первый элемент которого - тип объекта (например "posts").
+    До soft_ttl значение считается свежим. После soft_ttl устаревшее значение сразу отдаётся,
+    а в фоне запускается его обновление в отдельной сессии. Если обновление завершилось ошибкой
+    базы данных, устаревшее значение продолжает отдаваться до hard_ttl.
+    Отсутствие объекта (LookupError) запоминается на negative_ttl.
+    """
+
+    def __init__(
+        self,
+        soft_ttl: float,
+        hard_ttl: float,
+        negative_ttl: float,
+        max_entries: int,
+    ) -> None:
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.max_entries = max_entries
+
+        self.missing = NegativeCache(negative_ttl, max_entries)
+
+        self._entries: OrderedDict[tuple[Hashable, ...], CacheEntry] = OrderedDict()
+        self._refreshing: dict[tuple[Hashable, ...], asyncio.Task[None]] = {}
+        # Увеличивается при инвалидации, чтобы загрузки, начатые до изменения, не попали в кеш
+        self._generation = 0
+
+    async def get[T](
+        self,
+        key: tuple[Hashable, ...],
+        loader: Callable[[AsyncSession], Awaitable[T]],
+        session: AsyncSession,
+    ) -> CacheResult[T]:
+        if entry := self._entries.get(key):
+            age = time.monotonic() - entry.loaded_at
+
+            if age < self.soft_ttl:
+                self._entries.move_to_end(key)
+                cache_requests.labels("objects", "fresh").inc()
+                return CacheResult(entry.value, age, stale=False)
+
+            if age < self.hard_ttl:
+                self._entries.move_to_end(key)
+                self._schedule_refresh(key, loader)
+                cache_requests.labels("objects", "stale").inc()
+                return CacheResult(entry.value, age, stale=True)
+
+            del self._entries[key]
+
+        if key in self.missing:
+            cache_requests.labels("objects", "negative").inc()
+            msg = "Указанный объект не найден"
+            raise LookupError(msg)
+
+        cache_requests.labels("objects", "miss").inc()
+
+        generation, missing_generation = self._generation, self.missing.generation
+
+        try:
+            value = await single_flight.run(key, lambda: loader(session))
+        except LookupError:
+            self.missing.add(key, missing_generation)
+            raise
+
+        self._store(key, value, generation)
+
+        return CacheResult(value, 0.0, stale=False)
+
+    def invalidate(self, *object_types: str) -> None:
+        """Удаляет из кеша все значения указанных типов объектов."""
+        self._generation += 1
+        self.missing.discard_matching(lambda key: key[0] in object_types)
+
+        for key in [key for key in self._entries if key[0] in object_types]:
+            del self._entries[key]
+
+    def _store(self, key: tuple[Hashable, ...], value: Any, generation: int) -> None:
+        if generation != self._generation:
+            return
+
+        self._entries[key] = CacheEntry(value, time.monotonic())
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _schedule_refresh[T](
+        self,
+        key: tuple[Hashable, ...],
+        loader: Callable[[AsyncSession], Awaitable[T]],
+    ) -> None:
+        if key not in self._refreshing:
+            self._refreshing[key] = asyncio.create_task(self._refresh(key, loader))
+
+    async def _refresh[T](
+        self,
+        key: tuple[Hashable, ...],
+        loader: Callable[[AsyncSession], Awaitable[T]],
+    ) -> None:
+        generation = self._generation
+
+        try:
+            # Сессия запроса может быть закрыта раньше обновления, поэтому создаётся своя
+            async with read_session_maker() as session:
+                value = await single_flight.run(key, lambda: loader(session))
+        except LookupError:
+            self._entries.pop(key, None)
+        except (SQLAlchemyError, OSError):
+            logger.warning("Не удалось обновить значение %s в кеше", key, exc_info=True)
+        except Exception:
+            # Исключение фоновой задачи некому обработать, устаревшее значение остаётся
+            logger.exception("Непредвиденная ошибка при обновлении значения %s в кеше", key)
+        else:
+            self._store(key, value, generation)
+        finally:
+            del self._refreshing[key]
+
+
+response_cache = StaleCache(
+    soft_ttl=config.cache.soft_ttl_seconds,
+    hard_ttl=config.cache.hard_ttl_seconds,
+    negative_ttl=config.cache.negative_ttl_seconds,
+    max_entries=config.cache.max_entries,
+)
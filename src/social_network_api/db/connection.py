@@ -2,34 +2,301 @@
 
 from __future__ import annotations
 
+import logging
+import time
+import uuid
 from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Literal, override
 
 import redis.asyncio as async_redis
+from fastapi import Request, Response
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import RedisError
+from redis.exceptions import TimeoutError as RedisTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from social_network_api.db.instrumentation import attach_query_listeners
+from social_network_api.db.pool import InstrumentedQueuePool, PoolStats
+from social_network_api.db.replicas import Replica, ReplicaSet, consistency_token, parse_lsn
+from social_network_api.db.sessions import PrimarySession, ReadOnlySession
+from social_network_api.db.slow_queries import slow_query_log
 from social_network_api.schemas import config
+from social_network_api.utils.metrics import redis_command_duration
+from social_network_api.utils.tracing import attach_tracing_listeners, traced
 
-engine = create_async_engine(
-    url=config.database.ps_url.get_secret_value(),
-    echo=config.database.echo,
-    pool_size=20,  # основной пул
-    max_overflow=20,  # дополнительные соединения
-    pool_timeout=60,  # таймаут ожидания (сек)
+if TYPE_CHECKING:
+    from types import TracebackType
+
+    from redis.asyncio.client import Pipeline
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger("social_network_api")
+
+
+def _connect_args() -> dict[str, Any]:
+    if config.database.ps_pgbouncer_mode:
+        # PgBouncer в режиме transaction выполняет каждую транзакцию на любом соединении с сервером,
+        # поэтому подготовленные запросы не переиспользуются, а их имена не должны повторяться
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+
+    return {"prepared_statement_cache_size": config.database.ps_statement_cache_size}
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    new_engine = create_async_engine(
+        url=url,
+        echo=config.database.echo,
+        poolclass=InstrumentedQueuePool,
+        pool_size=config.database.ps_pool_size,  # основной пул
+        max_overflow=config.database.ps_max_overflow,  # дополнительные соединения
+        pool_timeout=config.database.ps_pool_timeout_seconds,  # таймаут ожидания (сек)
+        pool_pre_ping=config.database.ps_pool_pre_ping,
+        pool_recycle=config.database.ps_pool_recycle_seconds,
+        connect_args=_connect_args(),
+    )
+    attach_query_listeners(new_engine)
+    attach_tracing_listeners(new_engine)
+    slow_query_log.attach(new_engine)
+
+    return new_engine
+
+
+def _create_session_maker(
+    bind: AsyncEngine,
+    class_: type[AsyncSession] = AsyncSession,
+) -> async_sessionmaker[AsyncSession]:
+    # Позволяет создавать сессии с правильными настройками
+    return async_sessionmaker(
+        bind=bind,
+        class_=class_,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+engine = _create_engine(config.database.ps_url.get_secret_value())
+
+pool_stats = PoolStats()
+pool_stats.attach(engine)
+
+session_maker = _create_session_maker(engine, PrimarySession)
+# Сессии для чтения используют те же пулы соединений, но без транзакций
+read_session_maker = _create_session_maker(
+    engine.execution_options(isolation_level="AUTOCOMMIT"),
+    ReadOnlySession,
+)
+
+
+def _create_replica(url: str) -> Replica:
+    replica_engine = _create_engine(url)
+
+    return Replica(
+        name=f"{replica_engine.url.host}:{replica_engine.url.port}",
+        engine=replica_engine,
+        session_maker=_create_session_maker(
+            replica_engine.execution_options(isolation_level="AUTOCOMMIT"),
+            ReadOnlySession,
+        ),
+    )
+
+
+replicas = ReplicaSet(
+    [
+        _create_replica(url.strip())
+        for url in config.database.ps_replica_urls.get_secret_value().split(",")
+        if url.strip()
+    ],
+    check_interval=config.database.ps_replica_check_seconds,
 )
 
-# Позволяет создавать сессии с правильными настройками
-session_maker = async_sessionmaker(
-    bind=engine,
-    autoflush=False,
-    expire_on_commit=False,
+# Повторяются только ошибки установки и обрыва соединения (OSError возникает при подключении),
+# а не таймауты ответа: после таймаута команда могла быть выполнена,
+# а скрипты ротации и отзыва токенов не идемпотентны
+rd_pool = async_redis.BlockingConnectionPool.from_url(
+    config.database.rd_url.get_secret_value(),
+    decode_responses=True,
+    max_connections=config.database.rd_max_connections,
+    timeout=config.database.rd_pool_timeout_seconds,
+    socket_timeout=config.database.rd_socket_timeout_seconds,
+    socket_connect_timeout=config.database.rd_connect_timeout_seconds,
+    health_check_interval=config.database.rd_health_check_interval_seconds,
+    retry=Retry(
+        ExponentialBackoff(cap=0.5, base=0.05),
+        config.database.rd_retries,
+        supported_errors=(RedisConnectionError, OSError),
+    ),
+)
+
+
+class InstrumentedRedis(async_redis.Redis):
+    """Клиент Redis, замеряющий время выполнения каждой команды с учётом повторов."""
+
+    @override
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        command = str(args[0]).upper()
+        started_at = time.perf_counter()
+
+        # Ключи и аргументы не записываются в span, так как содержат идентификаторы сессий
+        try:
+            with traced(f"redis {command}", "client", **{"db.system": "redis"}):
+                return await super().execute_command(*args, **options)
+        finally:
+            redis_command_duration.labels(command).observe(time.perf_counter() - started_at)
+
+
+rd = InstrumentedRedis.from_pool(rd_pool)
+
+
+class CircuitOpenError(RedisError):
+    """Запрос к Redis не выполнен, так как Redis недавно был недоступен."""
+
+
+class CircuitBreaker:
+    """Прерыватель цепи для быстрого отказа при недоступности внешнего сервиса.
+
+    После failure_threshold ошибок соединения подряд цепь размыкается, и в течение reset_timeout
+    все запросы сразу завершаются CircuitOpenError. Затем пропускается один пробный запрос:
+    при его успехе цепь замыкается, при ошибке снова размыкается. Пробный запрос отмечается
+    в контексте выполняющей его задачи, поэтому запросы, начатые до размыкания и завершившиеся
+    позже, не снимают отметку и не замыкают цепь своим успехом.
+    Ошибки выполнения команд (например ResponseError) не считаются недоступностью.
+    """
+
+    failure_errors: tuple[type[BaseException], ...] = (
+        RedisConnectionError,
+        RedisTimeoutError,
+        OSError,
+        TimeoutError,
+    )
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.consecutive_failures = 0
+        self.opened_total = 0
+        self.rejected_total = 0
+
+        self._opened_at: float | None = None
+        self._trial_running = False
+        self._in_trial: ContextVar[bool] = ContextVar(f"{name}_trial", default=False)
+
+    @property
+    def state(self) -> Literal["closed", "open", "half_open"]:
+        if self._opened_at is None:
+            return "closed"
+
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return "open"
+
+        return "half_open"
+
+    async def __aenter__(self) -> None:
+        """Пропускает запрос или сразу отклоняет его, если цепь разомкнута."""
+        match self.state:
+            case "closed":
+                return
+            case "half_open" if not self._trial_running:
+                self._trial_running = True
+                self._in_trial.set(True)
+                return
+            case _:
+                self.rejected_total += 1
+                msg = f"{self.name} временно недоступен"
+                raise CircuitOpenError(msg)
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Учитывает результат запроса."""
+        trial = self._in_trial.get()
+
+        if trial:
+            self._in_trial.set(False)
+            self._trial_running = False
+
+        if exc is None:
+            if trial or self._opened_at is None:
+                self._on_success()
+        elif isinstance(exc, self.failure_errors):
+            self._on_failure()
+
+    def stats(self) -> dict[str, str | int]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_total": self.opened_total,
+            "rejected_total": self.rejected_total,
+        }
+
+    def _on_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info("%s снова доступен", self.name)
+
+        self.consecutive_failures = 0
+        self._opened_at = None
+
+    def _on_failure(self) -> None:
+        self.consecutive_failures += 1
+
+        if self._opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            if self._opened_at is None:
+                self.opened_total += 1
+                logger.error("%s недоступен, запросы временно не выполняются", self.name)
+
+            self._opened_at = time.monotonic()
+
+
+redis_breaker = CircuitBreaker(
+    name="Redis",
+    failure_threshold=config.database.rd_breaker_failure_threshold,
+    reset_timeout=config.database.rd_breaker_reset_seconds,
 )
 
-rd = async_redis.from_url(config.database.rd_url.get_secret_value(), decode_responses=True)
 
+@asynccontextmanager
+async def redis_pipeline(
+    redis: async_redis.Redis,
+    *,
+    transaction: bool = False,
+) -> AsyncIterator[Pipeline]:
+    """Создает конвейер команд Redis, выполняемый под прерывателем цепи.
+
+    Все команды конвейера отправляются за один сетевой запрос при вызове execute.
+    Время конвейера учитывается в метриках как команда PIPELINE или MULTI.
+    """
+    command = "MULTI" if transaction else "PIPELINE"
+
+    async with redis_breaker, redis.pipeline(transaction=transaction) as pipe:
+        started_at = time.perf_counter()
+
+        try:
+            with traced(f"redis {command}", "client", **{"db.system": "redis"}):
+                yield pipe
+        finally:
+            redis_command_duration.labels(command).observe(time.perf_counter() - started_at)
 
-async def get_db() -> AsyncIterator[AsyncSession]:
+
+async def get_db(request: Request, response: Response) -> AsyncIterator[AsyncSession]:
     """Создает подключение к базе данных для инъекции зависимостей FastAPI.
 
+    GET и HEAD запросы получают сессию только для чтения, которая освобождает соединение
+    после каждого запроса. Они читают с реплики, если реплики настроены и одна из них уже
+    воспроизвела последнюю запись клиента из токена согласованности. Остальные запросы идут
+    в основную базу данных, а после их записи клиенту выдаётся новый токен согласованности.
+
     Returns:
         AsyncIterator[AsyncSession]: генератор асинхронной сессии.
 
@@ -37,7 +304,28 @@ async def get_db() -> AsyncIterator[AsyncSession]:
         Iterator[AsyncIterator[AsyncSession]]: _description_
 
     """
+    if request.method in {"GET", "HEAD"}:
+        token = consistency_token(request)
+
+        if replicas.enabled and (replica := replicas.choose(parse_lsn(token))):
+            async with replica.session_maker() as db:
+                try:
+                    yield db
+                except Exception as exc:
+                    replicas.report_error(replica, exc)
+                    raise
+
+            return
+
+        async with read_session_maker() as db:
+            yield db
+
+        return
+
     async with session_maker() as db:
+        if replicas.enabled and isinstance(db, PrimarySession):
+            db.track_consistency(response, config.database.ps_consistency_token_seconds)
+
         yield db
 
 
@@ -11,6 +11,7 @@ from sqlalchemy.orm import joinedload
 from sqlalchemy.sql.base import ExecutableOption
 
 from social_network_api.db.models import CommentModel, PostModel
+from social_network_api.utils.timing import timed_async
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
@@ -27,6 +28,7 @@ class CommentDAL:
     )
 
     @staticmethod
+    @timed_async("dal")
     async def create(
         user_id: uuid.UUID,
         post_id: uuid.UUID,
@@ -41,6 +43,7 @@ class CommentDAL:
         return await CommentDAL.get_by_id(comment.id, session)
 
     @staticmethod
+    @timed_async("dal")
     async def get_by_id(
         comment_id: uuid.UUID,
         session: AsyncSession,
@@ -56,6 +59,7 @@ class CommentDAL:
         raise LookupError(msg)
 
     @staticmethod
+    @timed_async("dal")
     async def get_all(
         session: AsyncSession,
     ) -> Sequence[CommentModel]:
@@ -63,6 +67,7 @@ class CommentDAL:
         return comments.unique().all()
 
     @staticmethod
+    @timed_async("dal")
     async def update(
         comment_id: uuid.UUID,
         update_info: CommentUpdate,
@@ -77,6 +82,7 @@ class CommentDAL:
         return await CommentDAL.get_by_id(comment.id, session)
 
     @staticmethod
+    @timed_async("dal")
     async def drop(comment_id: uuid.UUID, session: AsyncSession) -> None:
         comment = await CommentDAL.get_by_id(comment_id, session)
 
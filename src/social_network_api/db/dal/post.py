@@ -11,6 +11,7 @@ from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.sql.base import ExecutableOption
 
 from social_network_api.db.models import CommentModel, PostModel
+from social_network_api.utils.timing import timed_async
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
@@ -27,6 +28,7 @@ class PostDAL:
     )
 
     @staticmethod
+    @timed_async("dal")
     async def create(user_id: uuid.UUID, post_info: PostCreate, session: AsyncSession) -> PostModel:
         post = PostModel(user_id=user_id, **post_info.model_dump())
 
@@ -36,6 +38,7 @@ class PostDAL:
         return await PostDAL.get_by_id(post.id, session)
 
     @staticmethod
+    @timed_async("dal")
     async def get_by_id(
         post_id: uuid.UUID,
         session: AsyncSession,
@@ -49,6 +52,7 @@ class PostDAL:
         raise LookupError(msg)
 
     @staticmethod
+    @timed_async("dal")
     async def get_all(
         session: AsyncSession,
     ) -> Sequence[PostModel]:
@@ -56,6 +60,7 @@ class PostDAL:
         return posts.unique().all()
 
     @staticmethod
+    @timed_async("dal")
     async def update(
         post_id: uuid.UUID,
         update_info: PostUpdate,
@@ -70,6 +75,7 @@ class PostDAL:
         return await PostDAL.get_by_id(post.id, session)
 
     @staticmethod
+    @timed_async("dal")
     async def drop(post_id: uuid.UUID, session: AsyncSession) -> None:
         post = await PostDAL.get_by_id(post_id, session)
 
@@ -9,6 +9,7 @@ from sqlalchemy import and_, select
 from sqlalchemy.inspection import inspect
 
 from social_network_api.db.models import RoleRuleModel
+from social_network_api.utils.timing import timed_async
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
@@ -20,6 +21,7 @@ class RoleRuleDAL:
     """Класс для работы с правилами ролей пользователей в базе данных."""
 
     @staticmethod
+    @timed_async("dal")
     async def get(
         role_rule_info: RoleRuleGet,
         session: AsyncSession,
@@ -43,6 +45,7 @@ class RoleRuleDAL:
         raise LookupError(msg)
 
     @staticmethod
+    @timed_async("dal")
     async def get_all(
         session: AsyncSession,
     ) -> Sequence[RoleRuleModel]:
@@ -50,6 +53,7 @@ class RoleRuleDAL:
         return role_rules.unique().all()
 
     @staticmethod
+    @timed_async("dal")
     async def update(
         role_rule_info: RoleRuleGet,
         update_info: RoleRuleUpdate,
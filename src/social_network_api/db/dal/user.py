@@ -2,17 +2,21 @@
 
 from __future__ import annotations
 
+from datetime import UTC, datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.orm import selectinload
 from sqlalchemy.sql.base import ExecutableOption
 
+from social_network_api.db.cache import NegativeCache
 from social_network_api.db.models import CommentModel, PostModel, UserModel
+from social_network_api.schemas import config
+from social_network_api.utils.timing import timed_async
 
 if TYPE_CHECKING:
     import uuid
-    from collections.abc import Sequence
+    from collections.abc import AsyncIterator, Sequence
 
     from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -22,16 +26,25 @@ if TYPE_CHECKING:
 class UserDAL:
     """Класс для работы с пользователями в базе данных."""
 
+    # Email, по которым недавно не был найден пользователь, например при попытках входа
+    _missing_emails: NegativeCache = NegativeCache(
+        ttl=config.cache.negative_ttl_seconds,
+        max_entries=config.cache.max_entries,
+    )
+
     @staticmethod
+    @timed_async("dal")
     async def create(user_info: UserCreate, session: AsyncSession) -> UserModel:
         user = UserModel(**user_info.model_dump(by_alias=True))
 
         session.add(user)
         await session.commit()
+        UserDAL._missing_emails.discard(user.email.lower())
 
         return await UserDAL.get_by_id(user.id, session, ("comments", "posts"))
 
     @staticmethod
+    @timed_async("dal")
     async def get_by_id(
         user_id: uuid.UUID,
         session: AsyncSession,
@@ -46,20 +59,57 @@ class UserDAL:
         raise LookupError(msg)
 
     @staticmethod
+    @timed_async("dal")
     async def get_with_email(
         email: str,
         session: AsyncSession,
         include: tuple[USER_INCLUDE_TYPE, ...] = (),
     ) -> UserModel:
+        msg = "Указанный пользователь не найден"
+        email = email.lower()
+
+        if email in UserDAL._missing_emails:
+            raise LookupError(msg)
+
+        generation = UserDAL._missing_emails.generation
+
         if user := await session.scalar(
-            select(UserModel).where(UserModel.email == email).options(*UserDAL._gen_opts(include))
+            select(UserModel)
+            .where(func.lower(UserModel.email) == email)
+            .options(*UserDAL._gen_opts(include))
         ):
             return user
 
-        msg = "Указанный пользователь не найден"
+        UserDAL._missing_emails.add(email, generation)
         raise LookupError(msg)
 
     @staticmethod
+    @timed_async("dal")
+    async def exists_with_email(email: str, session: AsyncSession) -> bool:
+        return bool(
+            await session.scalar(
+                select(
+                    select(UserModel.id)
+                    .where(func.lower(UserModel.email) == email.lower())
+                    .exists()
+                )
+            )
+        )
+
+    @staticmethod
+    async def iter_emails(
+        session: AsyncSession,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Sequence[str]]:
+        emails = await session.stream_scalars(
+            select(UserModel.email).execution_options(yield_per=batch_size)
+        )
+
+        async for batch in emails.partitions():
+            yield batch
+
+    @staticmethod
+    @timed_async("dal")
     async def get_all(
         session: AsyncSession,
         include: tuple[USER_INCLUDE_TYPE, ...] = (),
@@ -68,6 +118,7 @@ class UserDAL:
         return users.unique().all()
 
     @staticmethod
+    @timed_async("dal")
     async def update(
         user_id: uuid.UUID,
         update_info: UserUpdate,
@@ -78,10 +129,16 @@ class UserDAL:
         for field, value in update_info.model_dump(exclude_none=True).items():
             setattr(user, field, value)
 
+        if update_info.role:  # Сессии со старой ролью завершаются вместе с её сменой
+            user.sessions_revoked_at = datetime.now(UTC)
+
         await session.commit()
+        UserDAL._missing_emails.discard(user.email.lower())
+
         return await UserDAL.get_by_id(user.id, session, ("comments", "posts"))
 
     @staticmethod
+    @timed_async("dal")
     async def deactivate(user_id: uuid.UUID, session: AsyncSession) -> None:
         user = await UserDAL.get_by_id(user_id, session)
 
@@ -89,6 +146,15 @@ class UserDAL:
         await session.commit()
 
     @staticmethod
+    @timed_async("dal")
+    async def revoke_sessions(user_id: uuid.UUID, session: AsyncSession) -> None:
+        user = await UserDAL.get_by_id(user_id, session)
+
+        user.sessions_revoked_at = datetime.now(UTC)
+        await session.commit()
+
+    @staticmethod
+    @timed_async("dal")
     async def drop(user_id: uuid.UUID, session: AsyncSession) -> None:
         user = await UserDAL.get_by_id(user_id, session)
 
@@ -0,0 +1,132 @@
+"""Модуль для подсчёта запросов к базе данных в рамках одного запроса к API."""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import event
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from contextvars import Context
+
+    from sqlalchemy.engine import Connection, ExceptionContext
+    from sqlalchemy.ext.asyncio import AsyncEngine
+    from starlette.types import Scope
+
+
+@dataclass(slots=True)
+class QueryStats:
+    """Количество запросов к базе данных и их суммарное время."""
+
+    count: int = 0
+    duration: float = 0.0
+
+
+_current_request: ContextVar[Scope | None] = ContextVar("db_request", default=None)
+
+# Вложенные track_queries учитывают запрос во всех открытых блоках
+_current_stats: ContextVar[tuple[QueryStats, ...]] = ContextVar("query_stats", default=())
+
+
+class QueryBudgetExceededError(AssertionError):
+    """Код выполнил больше запросов к базе данных, чем было разрешено."""
+
+
+def attach_query_listeners(engine: AsyncEngine) -> None:
+    """Подписывается на выполнение запросов движка, чтобы учитывать их в track_queries."""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Считает запросы к базе данных, выполненные внутри блока, в том числе в зависимостях.
+
+    Значение хранится в ContextVar, поэтому учитываются только запросы текущей задачи asyncio
+    и задач, запущенных из неё. Блоки могут быть вложенными, например query_budget в тесте
+    и QueryCountMiddleware внутри приложения.
+    """
+    stats = QueryStats()
+    token = _current_stats.set((*_current_stats.get(), stats))
+
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def bind_request(scope: Scope) -> Iterator[None]:
+    """Запоминает запрос к API, в рамках которого выполняются запросы к базе данных."""
+    token = _current_request.set(scope)
+
+    try:
+        yield
+    finally:
+        _current_request.reset(token)
+
+
+def current_route(context: Context | None = None) -> str | None:
+    """Возвращает метод и шаблон пути (или путь до выбора маршрута) текущего запроса к API.
+
+    Запрос другой задачи можно узнать по её контексту, например из Task.get_context().
+    """
+    scope = _current_request.get() if context is None else context.get(_current_request)
+
+    if scope is None:
+        return None
+
+    return f"{scope['method']} {getattr(scope.get('route'), 'path', scope['path'])}"
+
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """Проверяет, что внутри блока выполнено не больше max_queries запросов к базе данных.
+
+    Предназначен для тестов, выполняющих приложение в той же задаче asyncio, например:
+        async with AsyncClient(transport=ASGITransport(app), base_url="http://test") as client:
+            with query_budget(4):
+                await client.patch(f"/posts/{post_id}", json=...)
+    """
+    with track_queries() as stats:
+        yield stats
+
+    if stats.count > max_queries:
+        msg = f"Выполнено {stats.count} запросов к базе данных при допустимых {max_queries}"
+        raise QueryBudgetExceededError(msg)
+
+
+def _before_cursor_execute(conn: Connection, *_: Any) -> None:
+    # Соединение выполняет запросы по одному, поэтому хватает одного значения
+    if _current_stats.get():
+        conn.info["query_started_at"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn: Connection, *_: Any) -> None:
+    _count_query(conn)
+
+
+def _handle_error(context: ExceptionContext) -> None:
+    # Запрос с ошибкой тоже выполнялся, а его время начала не должно остаться в соединении
+    if context.connection is not None:
+        _count_query(context.connection)
+
+
+def _count_query(conn: Connection) -> None:
+    if (
+        not (all_stats := _current_stats.get())
+        or (started_at := conn.info.pop("query_started_at", None)) is None
+    ):
+        return
+
+    duration = time.perf_counter() - started_at
+
+    for stats in all_stats:
+        stats.count += 1
+        stats.duration += duration
@@ -3,12 +3,13 @@
 from __future__ import annotations
 
 import re
+import time
 import uuid
 from datetime import datetime
 from typing import override
 
 import bcrypt
-from sqlalchemy import ForeignKey, String, func
+from sqlalchemy import DateTime, ForeignKey, Index, String, func
 from sqlalchemy.orm import (
     DeclarativeBase,
     Mapped,
@@ -25,6 +26,9 @@ from social_network_api.schemas import (
     OBJECT_TYPE,
     USER_ROLE,
 )
+from social_network_api.utils.metrics import password_hash_duration
+from social_network_api.utils.timing import timed
+from social_network_api.utils.tracing import traced
 
 rename_pattern = re.compile(r"(?<!^)(?=[A-Z])")
 
@@ -62,11 +66,13 @@ class UserModel(BaseModel):
     name: Mapped[str] = mapped_column(String(50))
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())
 
-    email: Mapped[str] = mapped_column(String(255), unique=True)
+    email: Mapped[str] = mapped_column(String(255))  # Уникальность без учёта регистра ниже
     _password: Mapped[str] = mapped_column(
         "password",
         String(255),
     )
+    # Refresh токены, выданные не позже этого времени, не принимаются
+    sessions_revoked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
 
     posts: Mapped[list[PostModel]] = relationship(
         back_populates="user",
@@ -86,16 +92,32 @@ class UserModel(BaseModel):
             msg = "Password must be at least 8 characters long and at most 64 characters long."
             raise ValueError(msg)
 
-        return bcrypt.hashpw(value.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        started_at = time.perf_counter()
+
+        with timed("bcrypt"), traced("bcrypt.hashpw"):
+            hashed = bcrypt.hashpw(value.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
+        password_hash_duration.labels("hash").observe(time.perf_counter() - started_at)
+        return hashed
 
     def check_password(self, raw_password: str) -> bool:
-        return bcrypt.checkpw(raw_password.encode("utf-8"), self._password.encode("utf-8"))
+        started_at = time.perf_counter()
+
+        with timed("bcrypt"), traced("bcrypt.checkpw"):
+            matches = bcrypt.checkpw(raw_password.encode("utf-8"), self._password.encode("utf-8"))
+
+        password_hash_duration.labels("check").observe(time.perf_counter() - started_at)
+        return matches
 
     @override
     def get_user_id(self) -> uuid.UUID:
         return self.id
 
 
+# Email уникален без учёта регистра, поиск по lower(email) использует этот индекс
+Index("ix_users_email_lower", func.lower(UserModel.email), unique=True)
+
+
 class PostModel(BaseModel):
     """Модель поста."""
 
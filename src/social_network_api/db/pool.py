@@ -0,0 +1,128 @@
+"""Модуль с пулом соединений PostgreSQL, собирающим статистику своей работы."""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any, override
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from social_network_api.utils.metrics import db_pool_checkout_wait
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+    from sqlalchemy.pool import ConnectionPoolEntry
+
+
+class PoolStats:
+    """Статистика пула соединений.
+
+    Количество выданных и открытых соединений считается слушателями событий пула,
+    а время ожидания соединения - пулом InstrumentedQueuePool, так как у ожидания нет события.
+    """
+
+    def __init__(self) -> None:
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.connections_opened_total = 0
+        self.connections_invalidated_total = 0
+
+        self.checkouts_total = 0
+        self.checkout_timeouts_total = 0
+        self.checkout_wait_seconds_total = 0.0
+        self.checkout_wait_seconds_max = 0.0
+
+        self._engine: AsyncEngine | None = None
+
+    def attach(self, engine: AsyncEngine) -> None:
+        """Подписывается на события пула движка.
+
+        Слушатели регистрируются на движке, поэтому сохраняются при пересоздании пула.
+        """
+        self._engine = engine
+
+        event.listen(engine.sync_engine, "connect", self._on_connect)
+        event.listen(engine.sync_engine, "checkout", self._on_checkout)
+        event.listen(engine.sync_engine, "checkin", self._on_checkin)
+        event.listen(engine.sync_engine, "invalidate", self._on_invalidate)
+
+        if isinstance(engine.pool, InstrumentedQueuePool):
+            engine.pool.stats = self
+
+    def record_wait(self, seconds: float, *, timed_out: bool) -> None:
+        self.checkouts_total += 1
+        self.checkout_wait_seconds_total += seconds
+        self.checkout_wait_seconds_max = max(self.checkout_wait_seconds_max, seconds)
+        db_pool_checkout_wait.observe(seconds)
+
+        if timed_out:
+            self.checkout_timeouts_total += 1
+
+    def snapshot(self) -> dict[str, int | float]:
+        size = overflow = 0
+
+        if self._engine is not None and isinstance(
+            pool := self._engine.pool, AsyncAdaptedQueuePool
+        ):
+            size, overflow = pool.size(), max(pool.overflow(), 0)
+
+        return {
+            "size": size,
+            "overflow": overflow,
+            "in_use": self.in_use,
+            "peak_in_use": self.peak_in_use,
+            "connections_opened_total": self.connections_opened_total,
+            "connections_invalidated_total": self.connections_invalidated_total,
+            "checkouts_total": self.checkouts_total,
+            "checkout_timeouts_total": self.checkout_timeouts_total,
+            "checkout_wait_seconds_total": self.checkout_wait_seconds_total,
+            "checkout_wait_seconds_max": self.checkout_wait_seconds_max,
+        }
+
+    def _on_connect(self, *_: Any) -> None:
+        self.connections_opened_total += 1
+
+    def _on_checkout(self, *_: Any) -> None:
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def _on_checkin(self, *_: Any) -> None:
+        self.in_use -= 1
+
+    def _on_invalidate(self, *_: Any) -> None:
+        self.connections_invalidated_total += 1
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Асинхронный пул соединений, измеряющий время ожидания свободного соединения.
+
+    Время включает открытие нового соединения, если пул ещё не заполнен.
+    """
+
+    stats: PoolStats | None = None
+
+    @override
+    def _do_get(self) -> ConnectionPoolEntry:
+        started_at = time.perf_counter()
+
+        try:
+            entry = super()._do_get()
+        except PoolTimeoutError:
+            self._record_wait(started_at, timed_out=True)
+            raise
+
+        self._record_wait(started_at, timed_out=False)
+        return entry
+
+    @override
+    def recreate(self) -> InstrumentedQueuePool:
+        pool = super().recreate()
+        pool.stats = self.stats
+
+        return pool
+
+    def _record_wait(self, started_at: float, *, timed_out: bool) -> None:
+        if self.stats is not None:
+            self.stats.record_wait(time.perf_counter() - started_at, timed_out=timed_out)
@@ -0,0 +1,118 @@
+"""Модуль для распределения читающих запросов между репликами PostgreSQL."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+
+if TYPE_CHECKING:
+    from fastapi import Request
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+logger = logging.getLogger("social_network_api")
+
+CONSISTENCY_HEADER = "X-Consistency-Token"
+CONSISTENCY_COOKIE = "consistency_token"
+
+
+def consistency_token(request: Request) -> str | None:
+    """Возвращает токен согласованности клиента из заголовка или куки."""
+    return request.headers.get(CONSISTENCY_HEADER) or request.cookies.get(CONSISTENCY_COOKIE)
+
+
+def parse_lsn(lsn: str | None) -> int | None:
+    """Преобразует позицию WAL вида 16/B374D848 в число, некорректное значение даёт None."""
+    if not lsn:
+        return None
+
+    try:
+        high, low = lsn.split("/")
+        return (int(high, 16) << 32) | int(low, 16)
+    except ValueError:
+        return None
+
+
+@dataclass
+class Replica:
+    """Реплика базы данных и её последнее известное состояние."""
+
+    name: str
+    engine: AsyncEngine
+    session_maker: async_sessionmaker[AsyncSession]
+    healthy: bool = False
+    replay_lsn: int = 0
+
+
+class ReplicaSet:
+    """Набор реплик, между которыми по кругу распределяются читающие запросы.
+
+    Фоновая проверка раз в check_interval отмечает доступность реплик и запоминает позицию WAL,
+    до которой они воспроизвели изменения. Запрос с токеном согласованности (позицией WAL
+    после записи) отправляется только на реплику, которая уже дошла до этой позиции,
+    иначе - в основную базу данных. Позиция известна с задержкой до check_interval,
+    поэтому ошибка возможна только в сторону лишнего запроса в основную базу данных.
+    """
+
+    def __init__(self, replicas: list[Replica], check_interval: float) -> None:
+        self.replicas = replicas
+        self.check_interval = check_interval
+
+        self._next = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self, min_lsn: int | None = None) -> Replica | None:
+        """Возвращает следующую подходящую реплику или None, если читать нужно из основной БД."""
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._next % len(self.replicas)]
+            self._next += 1
+
+            if replica.healthy and (min_lsn is None or replica.replay_lsn >= min_lsn):
+                return replica
+
+        return None
+
+    def report_error(self, replica: Replica, exc: BaseException) -> None:
+        """Исключает реплику до следующей проверки, если ошибка связана с соединением."""
+        if isinstance(exc, OSError) or (isinstance(exc, DBAPIError) and exc.connection_invalidated):
+            logger.warning("Реплика %s недоступна", replica.name)
+            replica.healthy = False
+
+    async def check(self) -> None:
+        await asyncio.gather(*(self._check_replica(replica) for replica in self.replicas))
+
+    async def run_checks(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+    async def _check_replica(self, replica: Replica) -> None:
+        try:
+            async with replica.engine.connect() as conn:
+                in_recovery, replay_lsn = (
+                    await conn.execute(
+                        text("SELECT pg_is_in_recovery(), pg_last_wal_replay_lsn()::text")
+                    )
+                ).one()
+        except (SQLAlchemyError, OSError):
+            if replica.healthy:
+                logger.warning("Реплика %s недоступна", replica.name, exc_info=True)
+
+            replica.healthy = False
+            return
+
+        if not in_recovery:
+            logger.error("Реплика %s не находится в режиме восстановления", replica.name)
+
+        if not replica.healthy:
+            logger.info("Реплика %s доступна", replica.name)
+
+        replica.healthy = True
+        replica.replay_lsn = parse_lsn(replay_lsn) or 0
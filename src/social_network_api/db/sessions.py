@@ -0,0 +1,98 @@
+"""Модуль с сессиями базы данных для записывающих и читающих запросов."""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Any, cast, override
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from social_network_api.db.replicas import CONSISTENCY_COOKIE, CONSISTENCY_HEADER
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable
+
+    from fastapi import Response
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger("social_network_api")
+
+
+class PrimarySession(AsyncSession):
+    """Сессия основной базы данных, сообщающая клиенту позицию WAL после фиксации транзакции.
+
+    Если для сессии вызван track_consistency, в ответ записывается токен согласованности
+    в заголовке и куки, чтобы следующие чтения того же клиента не попали на отстающую реплику.
+    """
+
+    @override
+    async def commit(self) -> None:
+        await super().commit()
+
+        response: Response | None = self.info.get("consistency_response")
+
+        if response is None:
+            return
+
+        # Позиция вставки не меньше позиции записи фиксации, даже при synchronous_commit = off.
+        # Запрос выполняется в отдельном соединении: откат сессии после ошибки сделал бы
+        # устаревшими её объекты, которые вызывающий код читает после commit.
+        # Транзакция уже зафиксирована, поэтому ошибка здесь только лишает клиента токена
+        try:
+            async with cast("AsyncEngine", self.bind).connect() as conn:
+                lsn = await conn.scalar(text("SELECT pg_current_wal_insert_lsn()::text"))
+        except (SQLAlchemyError, OSError):
+            logger.warning(
+                "Не удалось получить позицию WAL для токена согласованности", exc_info=True
+            )
+            return
+
+        response.headers[CONSISTENCY_HEADER] = lsn
+        response.set_cookie(
+            CONSISTENCY_COOKIE,
+            lsn,
+            max_age=self.info["consistency_max_age"],
+            httponly=True,
+            secure=True,
+            samesite="none",
+        )
+
+    def track_consistency(self, response: Response, max_age: int) -> None:
+        self.info["consistency_response"] = response
+        self.info["consistency_max_age"] = max_age
+
+
+class ReadOnlySession(AsyncSession):
+    """Сессия для читающих запросов, возвращающая соединение в пул после каждого запроса.
+
+    Должна создаваться на движке с isolation_level="AUTOCOMMIT": запросы выполняются
+    без BEGIN и ROLLBACK, а фиксация транзакции не обращается к базе данных и только
+    освобождает соединение. Поэтому соединение не удерживается между запросами обработчика
+    и во время сериализации ответа. Результаты запросов буферизуются AsyncSession,
+    а объекты остаются в сессии, так как expire_on_commit=False.
+    """
+
+    @override
+    async def execute(self, *args: Any, **kwargs: Any) -> Any:  # pyright: ignore[reportIncompatibleMethodOverride]
+        return await self._released(super().execute(*args, **kwargs))
+
+    @override
+    async def scalar(self, *args: Any, **kwargs: Any) -> Any:  # pyright: ignore[reportIncompatibleMethodOverride]
+        return await self._released(super().scalar(*args, **kwargs))
+
+    @override
+    async def get(self, *args: Any, **kwargs: Any) -> Any:  # pyright: ignore[reportIncompatibleMethodOverride]
+        return await self._released(super().get(*args, **kwargs))
+
+    async def _released[T](self, query: Awaitable[T]) -> T:
+        # scalars выполняется через execute, поэтому тоже освобождает соединение
+        try:
+            result = await query
+        except Exception:
+            await self.rollback()
+            raise
+
+        await self.commit()
+        return result
@@ -0,0 +1,191 @@
+"""Модуль для журнала медленных запросов к базе данных."""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import decimal
+import logging
+import re
+import time
+import uuid
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+
+from social_network_api.db.instrumentation import current_route
+from social_network_api.schemas import config
+from social_network_api.utils.timing import current_operation
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Connection, ExecutionContext
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+slow_logger = logging.getLogger("social_network_api.slow_queries")
+
+# Значения этих типов не содержат персональных данных и записываются как есть
+SAFE_PARAM_TYPES = (
+    bool,
+    int,
+    float,
+    decimal.Decimal,
+    uuid.UUID,
+    datetime.date,
+    datetime.time,
+    datetime.timedelta,
+)
+
+
+# Блокировки строк EXPLAIN ANALYZE взял бы повторно, поэтому для таких запросов строится
+# только план без выполнения
+LOCKING_CLAUSE = re.compile(
+    r"\bFOR\s+(?:NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b",
+    re.IGNORECASE,
+)
+
+
+def redact_params(params: Any) -> Any:
+    """Заменяет строки и байты (email, хеши паролей, тексты постов) их типом и длиной."""
+    if params is None or isinstance(params, SAFE_PARAM_TYPES):
+        return params
+
+    if isinstance(params, dict):
+        return {key: redact_params(value) for key, value in params.items()}
+
+    if isinstance(params, list | tuple):
+        return [redact_params(value) for value in params]
+
+    if isinstance(params, str | bytes):
+        return f"<{type(params).__name__}:{len(params)}>"
+
+    return f"<{type(params).__name__}>"
+
+
+class SlowQueryLog:
+    """Записывает запросы дольше threshold в отдельный журнал.
+
+    В запись попадают текст запроса, параметры без строковых значений, DAL метод и маршрут API.
+    При explain для медленного SELECT в фоне на отдельном соединении в транзакции только
+    для чтения выполняется EXPLAIN (ANALYZE, BUFFERS) с теми же параметрами, не чаще раза
+    за explain_interval для одного текста запроса и не более одного одновременно. Функции
+    запроса, изменяющие данные, в такой транзакции завершаются ошибкой, а не выполняются
+    повторно. Для SELECT с FOR UPDATE или FOR SHARE строится план без ANALYZE.
+    Планы записываются в тот же журнал.
+    """
+
+    def __init__(self, threshold: float, *, explain: bool, explain_interval: float) -> None:
+        self.threshold = threshold
+        self.explain = explain
+        self.explain_interval = explain_interval
+
+        self._explained_at: dict[str, float] = {}
+        self._explain_task: asyncio.Task[None] | None = None
+
+    def attach(self, engine: AsyncEngine) -> None:
+        """Подписывается на выполнение запросов движка, при threshold <= 0 ничего не делает."""
+        if self.threshold <= 0:
+            return
+
+        # Соединение выполняет запросы по одному, поэтому достаточно одного значения
+        def before_cursor_execute(conn: Connection, *_: Any) -> None:
+            conn.info["slow_query_started_at"] = time.perf_counter()
+
+        def after_cursor_execute(
+            *,
+            conn: Connection,
+            statement: str,
+            parameters: Any,
+            context: ExecutionContext,
+            executemany: bool,
+            **_: Any,
+        ) -> None:
+            if (started_at := conn.info.pop("slow_query_started_at", None)) is None:
+                return
+
+            duration = time.perf_counter() - started_at
+
+            if duration >= self.threshold and not context.execution_options.get("explain"):
+                self._record(engine, statement, parameters, duration, explain=not executemany)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute, named=True)
+
+    def _record(
+        self,
+        engine: AsyncEngine,
+        statement: str,
+        parameters: Any,
+        duration: float,
+        *,
+        explain: bool,
+    ) -> None:
+        slow_logger.warning(
+            "%.1f мс, %s, %s: %s; параметры: %s",
+            duration * 1000,
+            current_operation() or "-",
+            current_route() or "-",
+            statement,
+            redact_params(parameters),
+            extra={
+                "duration_ms": round(duration * 1000, 1),
+                "operation": current_operation(),
+                "route": current_route(),
+            },
+        )
+
+        if explain and self._should_explain(statement):
+            self._explain_task = asyncio.get_running_loop().create_task(
+                self._explain(engine, statement, parameters)
+            )
+
+    def _should_explain(self, statement: str) -> bool:
+        # EXPLAIN ANALYZE выполняет запрос, поэтому изменяющие данные запросы не анализируются
+        if not self.explain or not statement.lstrip().upper().startswith("SELECT"):
+            return False
+
+        if self._explain_task is not None and not self._explain_task.done():
+            return False
+
+        now = time.monotonic()
+
+        if now - self._explained_at.get(statement, -self.explain_interval) < self.explain_interval:
+            return False
+
+        self._explained_at = {
+            key: explained_at
+            for key, explained_at in self._explained_at.items()
+            if now - explained_at < self.explain_interval
+        }
+        self._explained_at[statement] = now
+
+        return True
+
+    async def _explain(self, engine: AsyncEngine, statement: str, parameters: Any) -> None:
+        options = "" if LOCKING_CLAUSE.search(statement) else "(ANALYZE, BUFFERS) "
+
+        try:
+            async with engine.connect() as conn:
+                await conn.exec_driver_sql(
+                    "SET TRANSACTION READ ONLY",
+                    execution_options={"explain": True},
+                )
+                plan = await conn.exec_driver_sql(
+                    f"EXPLAIN {options}{statement}",
+                    parameters,
+                    execution_options={"explain": True},
+                )
+                # Транзакция откатывается при выходе из блока
+                lines = [row[0] for row in plan]
+        except (SQLAlchemyError, OSError):
+            slow_logger.warning("Не удалось получить план запроса: %s", statement, exc_info=True)
+            return
+
+        slow_logger.warning("План запроса %s:\n%s", statement, "\n".join(lines))
+
+
+slow_query_log = SlowQueryLog(
+    threshold=config.database.ps_slow_query_seconds,
+    explain=config.database.ps_slow_query_explain,
+    explain_interval=config.database.ps_slow_query_explain_interval_seconds,
+)
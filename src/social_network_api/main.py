@@ -7,13 +7,118 @@
 
 from __future__ import annotations
 
-from fastapi import FastAPI, status
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
 
-from social_network_api.api.routers import auth, comment, post, role_rule, users
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
+from redis.exceptions import RedisError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from social_network_api.api.middlewares import (
+    ConcurrencyLimitMiddleware,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    QueryCountMiddleware,
+    RequestIdMiddleware,
+    ServerTimingMiddleware,
+    TracingMiddleware,
+    concurrency_limiter,
+)
+from social_network_api.api.routers import (
+    auth,
+    comment,
+    diagnostics,
+    health,
+    metrics,
+    post,
+    role_rule,
+    users,
+)
+from social_network_api.db.bloom import email_filter
+from social_network_api.db.connection import (
+    CircuitOpenError,
+    rd,
+    redis_breaker,
+    replicas,
+    session_maker,
+)
 from social_network_api.schemas import config
+from social_network_api.utils.logs import LogPipeline
+from social_network_api.utils.loop_monitor import loop_monitor
+from social_network_api.utils.metrics import (
+    mark_worker_stopped,
+    multiprocess_dir,
+    run_collectors_forever,
+)
+from social_network_api.utils.profiler import sampling_profiler
+from social_network_api.utils.tracing import create_exporter, tracer
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    """Запускает фоновые задачи приложения и останавливает их при завершении."""
+    log_pipeline = None
+
+    # Логгеры настраиваются из logconfig.ini до импорта приложения, поэтому замена их
+    # обработчиков на очередь выполняется при запуске
+    if config.logging.queue_enabled:
+        log_pipeline = LogPipeline(
+            max_size=config.logging.queue_max_size,
+            json_format=config.logging.json_format,
+            sample_rates=config.logging.sample_rates,
+        )
+        log_pipeline.start()
+
+    tasks = [asyncio.create_task(email_filter.run_rebuilds(session_maker, rd))]
+
+    if config.monitoring.loop_monitor_enabled:
+        tasks.append(asyncio.create_task(loop_monitor.run()))
+
+    if config.monitoring.sampling_enabled:
+        tasks.append(asyncio.create_task(sampling_profiler.run()))
+
+    if replicas.enabled:
+        tasks.append(asyncio.create_task(replicas.run_checks()))
+
+    if config.monitoring.metrics_enabled and multiprocess_dir():
+        tasks.append(
+            asyncio.create_task(run_collectors_forever(config.monitoring.metrics_collect_seconds))
+        )
+
+    if exporter := create_exporter(
+        config.monitoring.tracing_exporter,
+        config.monitoring.tracing_file,
+        config.monitoring.tracing_otlp_endpoint,
+    ):
+        tracer.exporter = exporter
+        tasks.append(
+            asyncio.create_task(tracer.run_exports(config.monitoring.tracing_export_seconds))
+        )
+
+    yield
+
+    for task in tasks:
+        task.cancel()
+
+    for task in tasks:
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    mark_worker_stopped()
+
+    if log_pipeline is not None:
+        log_pipeline.stop()
+
 
 app = FastAPI(
     title=config.api.name,
+    lifespan=lifespan,
     responses={
         status.HTTP_400_BAD_REQUEST: {"description": "Нарушение ограничений полей в базе данных"},
         status.HTTP_401_UNAUTHORIZED: {"description": "Необходима авторизация"},
@@ -28,9 +133,71 @@ app = FastAPI(
     },
 )
 
+if config.monitoring.profiling_enabled:
+    app.add_middleware(
+        ProfilingMiddleware,
+        directory=config.monitoring.profiling_dir,
+        min_interval=config.monitoring.profiling_min_interval_seconds,
+    )
+
+app.add_middleware(
+    QueryCountMiddleware,
+    debug_headers=config.api.debug_headers,
+    warn_threshold=config.api.query_warn_threshold,
+)
+app.add_middleware(ServerTimingMiddleware, sample_rate=config.api.timing_sample_rate)
+app.add_middleware(
+    ConcurrencyLimitMiddleware,
+    limiter=concurrency_limiter,
+    retry_after=config.concurrency.retry_after_seconds,
+)
+
+if config.monitoring.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+app.add_middleware(
+    TracingMiddleware,
+    trusted_networks=config.monitoring.tracing_trusted_networks,
+)
+app.add_middleware(RequestIdMiddleware)
+
+
+@app.exception_handler(RedisError)
+async def handle_redis_error(_: Request, exc: RedisError) -> JSONResponse:
+    """Отвечает 503 на запросы, которым нужен недоступный Redis (вход и обновление токенов).
+
+    Запросы с access токеном не обращаются к Redis и продолжают работать.
+    """
+    headers = {}
+
+    if isinstance(exc, CircuitOpenError):
+        headers["Retry-After"] = str(int(redis_breaker.reset_timeout))
+
+    return JSONResponse(
+        {"detail": "Сервис временно недоступен"},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers=headers,
+    )
+
+
+@app.exception_handler(PoolTimeoutError)
+async def handle_pool_timeout(_: Request, __: PoolTimeoutError) -> JSONResponse:
+    """Отвечает 503, если за ps_pool_timeout_seconds не освободилось соединение с базой данных."""
+    return JSONResponse(
+        {"detail": "Сервис временно недоступен"},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": "1"},
+    )
+
+
+app.include_router(health.router)
+
+if config.monitoring.metrics_enabled:
+    app.include_router(metrics.router)
 app.include_router(auth.router)
 
 app.include_router(users.router)
 app.include_router(post.router)
 app.include_router(comment.router)
 app.include_router(role_rule.router)
+app.include_router(diagnostics.router)
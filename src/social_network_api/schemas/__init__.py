@@ -24,6 +24,20 @@ from social_network_api.schemas.comment import (
     CommentResponse,
     CommentUpdate,
 )
+from social_network_api.schemas.diagnostics import (
+    AllocationDiffResponse,
+    AllocationStatResponse,
+    MemorySnapshotResponse,
+    MemoryStatusResponse,
+    OrmObjectsResponse,
+)
+from social_network_api.schemas.health import (
+    BulkheadStatsResponse,
+    CircuitBreakerStats,
+    HealthResponse,
+    LimiterStatsResponse,
+    PoolStatsResponse,
+)
 from social_network_api.schemas.post import (
     PostBaseResponse,
     PostChildResponse,
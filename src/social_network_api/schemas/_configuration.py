@@ -19,7 +19,7 @@ from pathlib import Path
 from typing import TYPE_CHECKING, Any, ClassVar, get_type_hints, override
 
 from pydantic import BaseModel as PydanticBaseModel
-from pydantic import Field, SecretStr
+from pydantic import Field, IPvAnyNetwork, SecretStr
 from pydantic_settings import BaseSettings, PydanticBaseSettingsSource, SettingsConfigDict
 
 if TYPE_CHECKING:
@@ -36,6 +36,11 @@ class APIConfig(PydanticBaseModel):
     jwt_secret: SecretStr = Field(json_schema_extra={"source": "env"})
     jwt_access_expire_seconds: int = Field(json_schema_extra={"source": "toml"})
     jwt_refresh_expire_days: int = Field(json_schema_extra={"source": "toml"})
+    jwt_cache_max_entries: int = Field(json_schema_extra={"source": "toml"})
+
+    debug_headers: bool = Field(json_schema_extra={"source": "toml"})
+    query_warn_threshold: int = Field(json_schema_extra={"source": "toml"})
+    timing_sample_rate: float = Field(json_schema_extra={"source": "toml"})
 
 
 class DatabaseConfig(PydanticBaseModel):
@@ -45,6 +50,101 @@ class DatabaseConfig(PydanticBaseModel):
     rd_url: SecretStr = Field(json_schema_extra={"source": "env"})
     echo: bool = Field(json_schema_extra={"source": "toml"})
 
+    ps_pool_size: int = Field(json_schema_extra={"source": "toml"})
+    ps_max_overflow: int = Field(json_schema_extra={"source": "toml"})
+    ps_pool_timeout_seconds: float = Field(json_schema_extra={"source": "toml"})
+    ps_pool_pre_ping: bool = Field(json_schema_extra={"source": "toml"})
+    ps_pool_recycle_seconds: int = Field(json_schema_extra={"source": "toml"})
+    ps_statement_cache_size: int = Field(json_schema_extra={"source": "toml"})
+    ps_pgbouncer_mode: bool = Field(json_schema_extra={"source": "toml"})
+    ps_slow_query_seconds: float = Field(json_schema_extra={"source": "toml"})
+    ps_slow_query_explain: bool = Field(json_schema_extra={"source": "toml"})
+    ps_slow_query_explain_interval_seconds: float = Field(json_schema_extra={"source": "toml"})
+
+    ps_replica_urls: SecretStr = Field(default=SecretStr(""), json_schema_extra={"source": "env"})
+    ps_replica_check_seconds: float = Field(json_schema_extra={"source": "toml"})
+    ps_consistency_token_seconds: int = Field(json_schema_extra={"source": "toml"})
+
+    rd_max_connections: int = Field(json_schema_extra={"source": "toml"})
+    rd_pool_timeout_seconds: float = Field(json_schema_extra={"source": "toml"})
+    rd_socket_timeout_seconds: float = Field(json_schema_extra={"source": "toml"})
+    rd_connect_timeout_seconds: float = Field(json_schema_extra={"source": "toml"})
+    rd_health_check_interval_seconds: int = Field(json_schema_extra={"source": "toml"})
+    rd_retries: int = Field(json_schema_extra={"source": "toml"})
+    rd_breaker_failure_threshold: int = Field(json_schema_extra={"source": "toml"})
+    rd_breaker_reset_seconds: float = Field(json_schema_extra={"source": "toml"})
+
+
+class CacheConfig(PydanticBaseModel):
+    """Настройки кеширования объектов при чтении."""
+
+    soft_ttl_seconds: float = Field(json_schema_extra={"source": "toml"})
+    hard_ttl_seconds: float = Field(json_schema_extra={"source": "toml"})
+    negative_ttl_seconds: float = Field(json_schema_extra={"source": "toml"})
+    max_entries: int = Field(json_schema_extra={"source": "toml"})
+
+    email_filter_size_bits: int = Field(json_schema_extra={"source": "toml"})
+    email_filter_hash_count: int = Field(json_schema_extra={"source": "toml"})
+    email_filter_rebuild_seconds: int = Field(json_schema_extra={"source": "toml"})
+
+
+class ConcurrencyConfig(PydanticBaseModel):
+    """Настройки ограничения количества одновременных запросов."""
+
+    initial_limit: int = Field(json_schema_extra={"source": "toml"})
+    min_limit: int = Field(json_schema_extra={"source": "toml"})
+    max_limit: int = Field(json_schema_extra={"source": "toml"})
+    latency_tolerance: float = Field(json_schema_extra={"source": "toml"})
+    backoff_ratio: float = Field(json_schema_extra={"source": "toml"})
+    default_share: float = Field(json_schema_extra={"source": "toml"})
+    idle_reset_seconds: float = Field(json_schema_extra={"source": "toml"})
+    retry_after_seconds: int = Field(json_schema_extra={"source": "toml"})
+
+    bulkhead_auth: int = Field(json_schema_extra={"source": "toml"})
+    bulkhead_single_reads: int = Field(json_schema_extra={"source": "toml"})
+    bulkhead_list_reads: int = Field(json_schema_extra={"source": "toml"})
+    bulkhead_writes: int = Field(json_schema_extra={"source": "toml"})
+    bulkhead_wait_seconds: float = Field(json_schema_extra={"source": "toml"})
+
+
+class MonitoringConfig(PydanticBaseModel):
+    """Настройки метрик и диагностики приложения."""
+
+    metrics_enabled: bool = Field(json_schema_extra={"source": "toml"})
+    metrics_collect_seconds: float = Field(json_schema_extra={"source": "toml"})
+
+    tracing_exporter: str = Field(json_schema_extra={"source": "toml"})
+    tracing_file: str = Field(json_schema_extra={"source": "toml"})
+    tracing_otlp_endpoint: str = Field(json_schema_extra={"source": "toml"})
+    tracing_sample_rate: float = Field(json_schema_extra={"source": "toml"})
+    tracing_trusted_networks: list[IPvAnyNetwork] = Field(json_schema_extra={"source": "toml"})
+    tracing_max_queue: int = Field(json_schema_extra={"source": "toml"})
+    tracing_export_seconds: float = Field(json_schema_extra={"source": "toml"})
+
+    loop_monitor_enabled: bool = Field(json_schema_extra={"source": "toml"})
+    loop_monitor_interval_seconds: float = Field(json_schema_extra={"source": "toml"})
+    loop_monitor_threshold_seconds: float = Field(json_schema_extra={"source": "toml"})
+
+    profiling_enabled: bool = Field(json_schema_extra={"source": "toml"})
+    profiling_dir: str = Field(json_schema_extra={"source": "toml"})
+    profiling_min_interval_seconds: float = Field(json_schema_extra={"source": "toml"})
+
+    sampling_enabled: bool = Field(json_schema_extra={"source": "toml"})
+    sampling_interval_seconds: float = Field(json_schema_extra={"source": "toml"})
+    sampling_window_minutes: int = Field(json_schema_extra={"source": "toml"})
+
+    memory_trace_frames: int = Field(json_schema_extra={"source": "toml"})
+    memory_max_snapshots: int = Field(json_schema_extra={"source": "toml"})
+
+
+class LoggingConfig(PydanticBaseModel):
+    """Настройки записи логов, сами обработчики описаны в logconfig.ini."""
+
+    queue_enabled: bool = Field(json_schema_extra={"source": "toml"})
+    queue_max_size: int = Field(json_schema_extra={"source": "toml"})
+    json_format: bool = Field(json_schema_extra={"source": "toml"})
+    sample_rates: dict[str, float] = Field(json_schema_extra={"source": "toml"})
+
 
 ########## Класс настроек ##########
 
@@ -60,6 +160,10 @@ class Config(BaseSettings):
 
     api: APIConfig
     database: DatabaseConfig
+    cache: CacheConfig
+    concurrency: ConcurrencyConfig
+    monitoring: MonitoringConfig
+    logging: LoggingConfig
 
     # Переопределение функции позволяет настроить получение значений из источников
     @classmethod
@@ -11,7 +11,7 @@ from pydantic import Field
 from social_network_api.schemas._common import BaseSchema
 
 if TYPE_CHECKING:  # Требуется для корректной работы отложенного импорта
-    from social_network_api.schemas import PostResponse, UserResponse
+    from social_network_api.schemas import PostBaseResponse, PostResponse, UserResponse
 
 
 class CommentCreate(BaseSchema):
@@ -36,12 +36,15 @@ class CommentChildPostResponse(CommentBaseResponse):
 class CommentChildUserResponse(CommentBaseResponse):
     """Схема для ответа с комментарием в составе пользователя."""
 
-    post: PostResponse | None = None
+    # Без автора поста: через его комментарии ответ снова дошёл бы до этого пользователя
+    post: PostBaseResponse | None = None
 
 
 class CommentResponse(CommentChildUserResponse, CommentChildPostResponse):
     """Схема для ответа с комментарием."""
 
+    post: PostResponse | None = None
+
 
 class CommentUpdate(BaseSchema):
     """Схема для обновления комментария."""
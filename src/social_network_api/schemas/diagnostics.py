@@ -0,0 +1,52 @@
+"""Схемы для диагностики памяти воркера."""
+
+from __future__ import annotations
+
+import datetime
+
+from social_network_api.schemas._common import BaseSchema
+
+
+class MemorySnapshotResponse(BaseSchema):
+    """Схема для снимка выделенной памяти tracemalloc."""
+
+    id: int
+    taken_at: datetime.datetime
+    size_bytes: int
+    count: int
+
+
+class MemoryStatusResponse(BaseSchema):
+    """Схема для состояния tracemalloc и сохранённых снимков."""
+
+    tracing: bool
+    frames: int
+    current_bytes: int
+    peak_bytes: int
+    overhead_bytes: int
+    snapshots: list[MemorySnapshotResponse]
+
+
+class AllocationStatResponse(BaseSchema):
+    """Схема для памяти, выделенной одной строкой кода и ещё не освобождённой."""
+
+    file: str
+    line: int
+    size_bytes: int
+    count: int
+
+
+class AllocationDiffResponse(AllocationStatResponse):
+    """Схема для изменения памяти, выделенной строкой кода, между двумя снимками."""
+
+    size_diff_bytes: int
+    count_diff: int
+
+
+class OrmObjectsResponse(BaseSchema):
+    """Схема для количества объектов моделей в памяти и в identity map сессий."""
+
+    sessions: int
+    identity_map_entries: int
+    identity_map_by_model: dict[str, int]
+    objects_by_model: dict[str, int]
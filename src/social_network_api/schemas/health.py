@@ -0,0 +1,62 @@
+"""Схемы для проверки состояния сервиса."""
+
+from __future__ import annotations
+
+from typing import Literal
+
+from social_network_api.schemas._common import BaseSchema
+
+
+class CircuitBreakerStats(BaseSchema):
+    """Схема для состояния прерывателя цепи внешнего сервиса."""
+
+    state: Literal["closed", "open", "half_open"]
+    consecutive_failures: int
+    opened_total: int
+    rejected_total: int
+
+
+class PoolStatsResponse(BaseSchema):
+    """Схема для статистики пула соединений с базой данных."""
+
+    size: int
+    overflow: int
+    in_use: int
+    peak_in_use: int
+    connections_opened_total: int
+    connections_invalidated_total: int
+    checkouts_total: int
+    checkout_timeouts_total: int
+    checkout_wait_seconds_total: float
+    checkout_wait_seconds_max: float
+
+
+class LimiterStatsResponse(BaseSchema):
+    """Схема для состояния адаптивного ограничения одновременных запросов."""
+
+    limit: float
+    in_flight: int
+    peak_in_flight: int
+    accepted_total: int
+    rejected_auth_total: int
+    rejected_default_total: int
+    latency_ewma_seconds: float
+    latency_baseline_seconds: float
+
+
+class BulkheadStatsResponse(BaseSchema):
+    """Схема для состояния ограничения запросов одного класса эндпоинтов."""
+
+    limit: int
+    in_use: int
+    rejected_total: int
+
+
+class HealthResponse(BaseSchema):
+    """Схема для ответа с состоянием сервиса и его зависимостей."""
+
+    status: Literal["ok", "degraded"]
+    redis: CircuitBreakerStats
+    database: PoolStatsResponse
+    limiter: LimiterStatsResponse
+    bulkheads: dict[str, BulkheadStatsResponse]
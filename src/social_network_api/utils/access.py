@@ -9,6 +9,7 @@ from fastapi import HTTPException, status
 from social_network_api.db.dal import RoleRuleDAL
 from social_network_api.db.models import RoleRuleModel
 from social_network_api.schemas import RoleRuleGet, RuleInfo
+from social_network_api.utils.tracing import traced_async
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
@@ -17,6 +18,7 @@ if TYPE_CHECKING:
     from social_network_api.schemas import ACTION_TYPE, OBJECT_TYPE
 
 
+@traced_async()
 async def get_rule_info(
     authorized_user: UserModel,
     object_type: OBJECT_TYPE,
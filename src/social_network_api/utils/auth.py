@@ -2,24 +2,117 @@
 
 from __future__ import annotations
 
+import hashlib
+import logging
 import secrets
+import time
+import uuid
+from collections import OrderedDict
 from datetime import UTC, datetime, timedelta
 from typing import TYPE_CHECKING, Any, Literal
 
 import jwt
 from fastapi import HTTPException, Response, status
+from redis.exceptions import RedisError
 
+from social_network_api.db.connection import redis_breaker, redis_pipeline
 from social_network_api.db.dal import UserDAL
 from social_network_api.schemas import AuthResponse, Cookies, UserResponse, config
+from social_network_api.utils.metrics import cache_requests
+from social_network_api.utils.timing import timed
+from social_network_api.utils.tracing import traced
 
 if TYPE_CHECKING:
-    import uuid
-
     from redis.asyncio import Redis
     from sqlalchemy.ext.asyncio import AsyncSession
 
     from social_network_api.db.models import UserModel
 
+logger = logging.getLogger("social_network_api")
+
+REFRESH_KEY_PREFIX = "refresh_token:"
+# Индекс активных сессий пользователя: sorted set из id refresh токенов со временем их истечения
+SESSIONS_KEY_PREFIX = "user_sessions:"
+
+# Атомарно удаляет старый refresh токен и сохраняет новый за тем же пользователем,
+# заменяя его и в индексе сессий. Ключ индекса зависит от найденного id пользователя,
+# поэтому он собирается внутри скрипта из префикса.
+# Возвращает id пользователя или nil, если старый токен уже использован или истёк.
+REFRESH_ROTATION_SCRIPT = """
+local user_id = redis.call("GETDEL", KEYS[1])
+if not user_id then
+    return false
+end
+
+local ttl, now = tonumber(ARGV[1]), tonumber(ARGV[2])
+local sessions_key = ARGV[5] .. user_id
+
+redis.call("SET", KEYS[2], user_id, "EX", ttl)
+redis.call("ZREM", sessions_key, ARGV[3])
+redis.call("ZADD", sessions_key, now + ttl, ARGV[4])
+redis.call("ZREMRANGEBYSCORE", sessions_key, "-inf", now)
+redis.call("EXPIRE", sessions_key, ttl)
+return user_id
+"""
+
+# Удаляет один refresh токен и убирает его из индекса сессий пользователя
+SESSION_REVOKE_SCRIPT = """
+local user_id = redis.call("GETDEL", KEYS[1])
+if user_id then
+    redis.call("ZREM", ARGV[2] .. user_id, ARGV[1])
+end
+return user_id
+"""
+
+# Удаляет все refresh токены пользователя по индексу сессий и сам индекс
+SESSIONS_REVOKE_ALL_SCRIPT = """
+local refresh_ids = redis.call("ZRANGE", KEYS[1], 0, -1)
+for _, refresh_id in ipairs(refresh_ids) do
+    redis.call("DEL", ARGV[1] .. refresh_id)
+end
+
+redis.call("DEL", KEYS[1])
+return #refresh_ids
+"""
+
+
+class VerifiedTokenCache:
+    """Ограниченный кеш уже проверенных JWT.
+
+    Ключом является SHA-256 токена, а значением - его проверенные данные. Запись удаляется
+    по истечении токена (exp), поэтому кеш не продлевает жизнь токенов. При переполнении
+    удаляются давно не использованные записи.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[bytes, dict[str, Any]] = OrderedDict()
+
+    def get(self, token: str) -> dict[str, Any] | None:
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+
+        if (payload := self._entries.get(key)) is None:
+            cache_requests.labels("jwt", "miss").inc()
+            return None
+
+        if payload["exp"] <= time.time():
+            del self._entries[key]
+            cache_requests.labels("jwt", "miss").inc()
+            return None
+
+        self._entries.move_to_end(key)
+        cache_requests.labels("jwt", "fresh").inc()
+        return payload
+
+    def add(self, token: str, payload: dict[str, Any]) -> None:
+        self._entries[hashlib.sha256(token.encode("utf-8")).digest()] = payload
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+verified_tokens = VerifiedTokenCache(config.api.jwt_cache_max_entries)
+
 
 async def generate_access_token(user_id: uuid.UUID) -> str:
     return jwt.encode(
@@ -38,6 +131,8 @@ async def generate_refresh_token(refresh_id: str) -> str:
         {
             "sub": refresh_id,
             "type": "refresh",
+            # С долями секунды, чтобы сравнивать с users.sessions_revoked_at
+            "iat": datetime.now(UTC).timestamp(),
             "exp": datetime.now(UTC) + timedelta(days=config.api.jwt_refresh_expire_days),
         },
         key=config.api.jwt_secret.get_secret_value(),
@@ -45,30 +140,45 @@ async def generate_refresh_token(refresh_id: str) -> str:
     )
 
 
+def decode_token(token: str, token_type: Literal["access", "refresh"]) -> dict[str, Any]:
+    if (payload := verified_tokens.get(token)) is None:
+        try:
+            payload = jwt.decode(
+                token,
+                config.api.jwt_secret.get_secret_value(),
+                algorithms=["HS256"],
+                options={"require": ["exp", "sub", "type"]},
+            )
+        except jwt.PyJWTError:
+            raise HTTPException(status.HTTP_401_UNAUTHORIZED, f"Некорректный {token_type} токен")
+
+        verified_tokens.add(token, payload)
+
+    if token_type != payload.get("type"):
+        raise HTTPException(
+            status.HTTP_401_UNAUTHORIZED,
+            "Токен не содержит необходимой информации",
+        )
+
+    return payload
+
+
 async def get_user_by_token(
     token: str,
     token_type: Literal["access", "refresh"],
     db: AsyncSession,
     rd: Redis,
 ) -> UserModel:
-    try:
-        payload: dict[str, Any] = jwt.decode(
-            token,
-            config.api.jwt_secret.get_secret_value(),
-            algorithms=["HS256"],
-        )
-
-        if token_type != payload.get("type"):
-            raise HTTPException(
-                status.HTTP_401_UNAUTHORIZED,
-                "Токен не содержит необходимой информации",
-            )
+    with timed("jwt"), traced("decode_token"):
+        payload = decode_token(token, token_type)
 
+    try:
         match token_type:
             case "access":  # Здесь sub это user_id
                 user_id = payload["sub"]
             case "refresh":  # Здесь sub это токен из redis
-                user_id = await rd.get(f"refresh_token:{payload['sub']}")
+                async with redis_breaker:
+                    user_id = await rd.get(f"{REFRESH_KEY_PREFIX}{payload['sub']}")
 
                 if user_id is None:
                     raise LookupError
@@ -79,8 +189,6 @@ async def get_user_by_token(
             return user
 
         raise LookupError
-    except jwt.PyJWTError:
-        raise HTTPException(status.HTTP_401_UNAUTHORIZED, f"Некорректный {token_type} токен")
     except LookupError:
         raise HTTPException(
             status.HTTP_403_FORBIDDEN,
@@ -94,12 +202,74 @@ async def create_user_tokens(
     response: Response,
 ) -> AuthResponse:
     refresh_id = secrets.token_urlsafe(32)
-    await rd.set(
-        f"refresh_token:{refresh_id}",
-        str(user_info.id),
-        ex=config.api.jwt_refresh_expire_days * 3600 * 24,
-    )
+    refresh_ttl = config.api.jwt_refresh_expire_days * 3600 * 24
+    sessions_key = f"{SESSIONS_KEY_PREFIX}{user_info.id}"
+    now = int(datetime.now(UTC).timestamp())
+
+    async with redis_pipeline(rd, transaction=True) as pipe:
+        pipe.set(f"{REFRESH_KEY_PREFIX}{refresh_id}", str(user_info.id), ex=refresh_ttl)
+        pipe.zadd(sessions_key, {refresh_id: now + refresh_ttl})
+        pipe.zremrangebyscore(sessions_key, "-inf", now)
+        pipe.expire(sessions_key, refresh_ttl)
+        await pipe.execute()
+
+    return await issue_user_tokens(user_info, refresh_id, response)
+
+
+async def rotate_user_tokens(
+    refresh_token: str,
+    db: AsyncSession,
+    rd: Redis,
+    response: Response,
+) -> AuthResponse:
+    """Заменяет refresh токен на новый за один запрос к Redis.
+
+    Старый токен удаляется атомарно, поэтому при одновременных обновлениях
+    одним токеном успешно только одно из них. Токен, выданный до завершения всех сессий
+    пользователя (users.sessions_revoked_at), отклоняется, даже если он остался в Redis.
+    """
+    payload = decode_token(refresh_token, "refresh")
+    refresh_id = secrets.token_urlsafe(32)
+
+    async with redis_breaker:
+        user_id: str | None = await rd.register_script(REFRESH_ROTATION_SCRIPT)(
+            keys=[f"{REFRESH_KEY_PREFIX}{payload['sub']}", f"{REFRESH_KEY_PREFIX}{refresh_id}"],
+            args=[
+                config.api.jwt_refresh_expire_days * 3600 * 24,
+                int(datetime.now(UTC).timestamp()),
+                payload["sub"],
+                refresh_id,
+                SESSIONS_KEY_PREFIX,
+            ],
+        )
+
+    if user_id is None:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Токен не найден")
+
+    try:
+        user = await UserDAL.get_by_id(uuid.UUID(user_id), db)
 
+        if not user.is_active:
+            raise LookupError
+    except LookupError:
+        await revoke_user_session(refresh_id, rd)
+        raise HTTPException(
+            status.HTTP_403_FORBIDDEN,
+            "К refresh токену привязан несуществующий пользователь",
+        )
+
+    if user.sessions_revoked_at and payload.get("iat", 0) <= user.sessions_revoked_at.timestamp():
+        await revoke_user_session(refresh_id, rd)
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Сессия завершена, войдите заново")
+
+    return await issue_user_tokens(UserResponse.model_validate(user), refresh_id, response)
+
+
+async def issue_user_tokens(
+    user_info: UserResponse,
+    refresh_id: str,
+    response: Response,
+) -> AuthResponse:
     access_token = await generate_access_token(user_info.id)
     refresh_token = await generate_refresh_token(refresh_id)
 
@@ -133,28 +303,50 @@ async def delete_user_tokens(
     rd: Redis,
     response: Response,
 ) -> None:
-    try:
-        if cookies.refresh_token:
-            payload: dict[str, Any] = jwt.decode(
-                cookies.refresh_token,
-                config.api.jwt_secret.get_secret_value(),
-                algorithms=["HS256"],
-            )
+    if cookies.refresh_token:
+        payload = decode_token(cookies.refresh_token, "refresh")
+        await revoke_user_session(payload["sub"], rd)
 
-            if payload.get("type") != "refresh":
-                raise HTTPException(
-                    status.HTTP_401_UNAUTHORIZED,
-                    "Токен не содержит необходимой информации",
-                )
+    response.delete_cookie("access_token")
+    response.delete_cookie("refresh_token")
 
-            await rd.delete(f"refresh_token:{payload['sub']}")
-    except jwt.PyJWTError:
-        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Некорректный refresh токен")
-    except LookupError:
-        raise HTTPException(
-            status.HTTP_403_FORBIDDEN,
-            "К refresh токену привязан несуществующий пользователь",
+
+async def revoke_user_session(refresh_id: str, rd: Redis) -> None:
+    async with redis_breaker:
+        await rd.register_script(SESSION_REVOKE_SCRIPT)(
+            keys=[f"{REFRESH_KEY_PREFIX}{refresh_id}"],
+            args=[refresh_id, SESSIONS_KEY_PREFIX],
+        )
+
+
+async def revoke_all_user_sessions(user_id: uuid.UUID, rd: Redis) -> int:
+    """Удаляет все refresh токены пользователя, возвращает количество завершённых сессий.
+
+    Стоимость зависит только от количества сессий пользователя, а не от размера Redis.
+    Выданные access токены продолжают действовать до истечения.
+    """
+    async with redis_breaker:
+        return await rd.register_script(SESSIONS_REVOKE_ALL_SCRIPT)(
+            keys=[f"{SESSIONS_KEY_PREFIX}{user_id}"],
+            args=[REFRESH_KEY_PREFIX],
+        )
+
+
+async def revoke_sessions_after_write(user_id: uuid.UUID, rd: Redis) -> None:
+    """Удаляет refresh токены пользователя из Redis после уже зафиксированной записи.
+
+    Запись (завершение сессий, смена роли, деактивация или удаление) уже не даёт обновить
+    токены: они проверяются по users.sessions_revoked_at и is_active. Поэтому ошибка Redis
+    (в том числе разомкнутый прерыватель цепи) не превращает её в ошибку ответа, а только
+    оставляет ключи токенов до истечения их времени жизни.
+    """
+    try:
+        revoked = await revoke_all_user_sessions(user_id, rd)
+    except RedisError:
+        logger.warning(
+            "Не удалось удалить refresh токены пользователя %s из Redis",
+            user_id,
+            exc_info=True,
         )
     else:
-        response.delete_cookie("access_token")
-        response.delete_cookie("refresh_token")
+        logger.info("Удалены refresh токены пользователя %s: %s", user_id, revoked)
@@ -0,0 +1,248 @@
+"""Неблокирующая запись логов через очередь.
+
+Обработчики из logconfig.ini (консоль и файлы с ротацией) остаются прежними, но вызываются
+в отдельном потоке QueueListener. Логгеры вместо них получают QueueHandler, который в цикле
+событий только подготавливает запись, добавляет к ней идентификаторы запроса и трассировки
+и кладёт её в очередь. Запись на диск и ротация файлов больше не останавливают воркер.
+"""
+
+from __future__ import annotations
+
+import copy
+import datetime
+import json
+import logging
+import queue
+import random
+import re
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import TYPE_CHECKING, Any
+
+from social_network_api.utils.metrics import log_records_dropped
+from social_network_api.utils.tracing import current_trace_id
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# Допустимый идентификатор запроса от клиента или балансировщика
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+# Стандартные атрибуты записи, остальные попадают в JSON как переданные в extra
+_RECORD_ATTRIBUTES = frozenset(logging.makeLogRecord({}).__dict__) | {
+    "message",
+    "asctime",
+    "request_id",
+    "trace_id",
+}
+
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+
+@contextmanager
+def bind_request_id(request_id: str | None) -> Iterator[str]:
+    """Назначает идентификатор запроса записям логов внутри блока.
+
+    Идентификатор из заголовка используется, только если он подходит под REQUEST_ID_PATTERN,
+    иначе создаётся новый.
+    """
+    if not request_id or not REQUEST_ID_PATTERN.fullmatch(request_id):
+        request_id = uuid.uuid4().hex
+
+    token = _request_id.set(request_id)
+
+    try:
+        yield request_id
+    finally:
+        _request_id.reset(token)
+
+
+def current_request_id() -> str | None:
+    """Возвращает идентификатор текущего запроса к API."""
+    return _request_id.get()
+
+
+class JsonFormatter(logging.Formatter):
+    """Записывает запись одной строкой JSON вместе с полями, переданными в extra."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.UTC).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "trace_id": getattr(record, "trace_id", None),
+        }
+        data.update(
+            (key, value) for key, value in record.__dict__.items() if key not in _RECORD_ATTRIBUTES
+        )
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+
+        if record.exc_text:
+            data["exception"] = record.exc_text
+
+        if record.stack_info:
+            data["stack"] = record.stack_info
+
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает только долю записей ниже WARNING для логгеров из sample_rates.
+
+    Доля логгера без своей настройки берётся у ближайшего родителя, по умолчанию пишутся все.
+    """
+
+    def __init__(self, sample_rates: dict[str, float]) -> None:
+        super().__init__()
+        self.sample_rates = sample_rates
+        self._cache: dict[str, float] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or random.random() < self._rate(record.name):  # noqa: S311
+            return True
+
+        log_records_dropped.labels("sampled").inc()
+        return False
+
+    def _rate(self, name: str) -> float:
+        if (rate := self._cache.get(name)) is not None:
+            return rate
+
+        rate, parent = 1.0, name
+
+        while parent:
+            if parent in self.sample_rates:
+                rate = self.sample_rates[parent]
+                break
+
+            parent = parent.rpartition(".")[0]
+
+        self._cache[name] = rate
+        return rate
+
+
+class ContextQueueHandler(QueueHandler):
+    """Кладёт запись в очередь вместе с номером набора обработчиков её логгера.
+
+    Сообщение форматируется сразу, чтобы аргументы не изменились до записи в другом потоке.
+    Если очередь заполнена, запись отбрасывается, а не останавливает цикл событий.
+    """
+
+    def __init__(self, log_queue: queue.Queue[Any], route: int) -> None:
+        super().__init__(log_queue)
+        self.route = route
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(
+                record.exc_info
+            )
+            record.exc_info = None
+
+        record.request_id = _request_id.get()
+        record.trace_id = current_trace_id()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait((self.route, record))
+        except queue.Full:
+            log_records_dropped.labels("queue_full").inc()
+
+
+class RoutingQueueListener(QueueListener):
+    """Передаёт запись из очереди обработчикам логгера, от которого она пришла."""
+
+    def __init__(self, log_queue: queue.Queue[Any], routes: list[list[logging.Handler]]) -> None:
+        super().__init__(log_queue)
+        self.routes = routes
+
+    def handle(self, record: Any) -> None:
+        route, record = record
+
+        for handler in self.routes[route]:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def enqueue_sentinel(self) -> None:
+        # В заполненной очереди нужно дождаться места, иначе поток не остановится
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """Переводит настроенные логгеры на запись через очередь и возвращает их обратно.
+
+    Каждый логгер с обработчиками получает ContextQueueHandler, а его обработчики вызываются
+    потоком RoutingQueueListener. При json_format обработчики записывают JSON.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: int,
+        json_format: bool,
+        sample_rates: dict[str, float],
+    ) -> None:
+        self.json_format = json_format
+        self.sampling = SamplingFilter(sample_rates)
+
+        self._queue: queue.Queue[Any] = queue.Queue(max_size)
+        self._listener: RoutingQueueListener | None = None
+        self._replaced: list[tuple[logging.Logger, list[logging.Handler]]] = []
+
+    def start(self) -> None:
+        """Заменяет обработчики логгеров и запускает поток записи."""
+        loggers = [logging.getLogger()] + [
+            logger
+            for logger in logging.Logger.manager.loggerDict.values()
+            if isinstance(logger, logging.Logger)
+        ]
+        routes: list[list[logging.Handler]] = []
+        route_ids: dict[tuple[int, ...], int] = {}
+
+        for logger in loggers:
+            if not logger.handlers:
+                continue
+
+            handlers = list(logger.handlers)
+            key = tuple(id(handler) for handler in handlers)
+
+            if (route := route_ids.get(key)) is None:
+                route = route_ids[key] = len(routes)
+                routes.append(handlers)
+
+            queue_handler = ContextQueueHandler(self._queue, route)
+            queue_handler.addFilter(self.sampling)
+
+            self._replaced.append((logger, handlers))
+            logger.handlers = [queue_handler]
+
+        if self.json_format:
+            for handler in {handler for handlers in routes for handler in handlers}:
+                handler.setFormatter(JsonFormatter())
+
+        self._listener = RoutingQueueListener(self._queue, routes)
+        self._listener.start()
+
+    def stop(self) -> None:
+        """Возвращает логгерам их обработчики и дожидается записи очереди."""
+        for logger, handlers in self._replaced:
+            logger.handlers = handlers
+
+        self._replaced.clear()
+
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
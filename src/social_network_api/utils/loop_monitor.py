@@ -0,0 +1,107 @@
+"""Наблюдение за задержками цикла событий.
+
+Синхронная работа в цикле событий (bcrypt, запись в файл, валидация больших моделей)
+задерживает все запросы воркера. Задача в цикле событий засыпает на interval и измеряет,
+насколько позже она проснулась, а отдельный поток проверяет, что она не опаздывает больше
+threshold. Если опоздание превышено, поток записывает в лог стек потока цикла событий -
+код, который в этот момент его блокирует.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from prometheus_client import Counter, Histogram
+
+from social_network_api.schemas import config
+
+logger = logging.getLogger("social_network_api.loop_lag")
+
+event_loop_lag = Histogram(
+    "event_loop_lag_seconds",
+    "Насколько позже назначенного просыпается задача в цикле событий",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+event_loop_blocked = Counter(
+    "event_loop_blocked_total",
+    "Случаи, когда цикл событий был заблокирован дольше порога",
+)
+
+
+class LoopLagMonitor:
+    """Измеряет задержку цикла событий и записывает стек блокирующего кода.
+
+    Стек записывается потоком один раз за каждую блокировку дольше threshold, а после
+    её окончания цикл событий записывает полное время блокировки.
+    """
+
+    def __init__(self, interval: float, threshold: float) -> None:
+        self.interval = interval
+        self.threshold = threshold
+
+        # Время, к которому задача в цикле событий должна проснуться
+        self._expected_at = time.monotonic()
+        self._captured_at: float | None = None
+        self._stopped = threading.Event()
+
+    async def run(self) -> None:
+        """Измеряет задержку цикла событий, пока задача не будет отменена."""
+        thread = threading.Thread(
+            target=self._watch,
+            args=(threading.get_ident(),),
+            name="loop-lag-monitor",
+            daemon=True,
+        )
+        self._stopped.clear()
+        thread.start()
+
+        try:
+            while True:
+                self._expected_at = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                lag = max(time.monotonic() - self._expected_at, 0.0)
+                event_loop_lag.observe(lag)
+
+                if lag >= self.threshold:
+                    event_loop_blocked.inc()
+                    logger.warning(
+                        "Цикл событий был заблокирован %.1f мс",
+                        lag * 1000,
+                        extra={"lag_ms": round(lag * 1000, 1)},
+                    )
+        finally:
+            self._stopped.set()
+            await asyncio.to_thread(thread.join)
+
+    def _watch(self, loop_thread_id: int) -> None:
+        # Проверка чаще порога, чтобы стек был снят, пока блокировка ещё продолжается
+        while not self._stopped.wait(min(self.interval, self.threshold) / 2):
+            expected_at = self._expected_at
+            lag = time.monotonic() - expected_at
+
+            if lag < self.threshold or self._captured_at == expected_at:
+                continue
+
+            self._captured_at = expected_at
+
+            if (frame := sys._current_frames().get(loop_thread_id)) is None:  # noqa: SLF001
+                continue
+
+            stack = "".join(traceback.format_stack(frame))
+            logger.warning(
+                "Цикл событий заблокирован уже %.1f мс, стек:\n%s",
+                lag * 1000,
+                stack,
+                extra={"lag_ms": round(lag * 1000, 1), "loop_stack": stack},
+            )
+
+
+loop_monitor = LoopLagMonitor(
+    interval=config.monitoring.loop_monitor_interval_seconds,
+    threshold=config.monitoring.loop_monitor_threshold_seconds,
+)
@@ -0,0 +1,150 @@
+"""Диагностика памяти воркера: снимки tracemalloc и объекты ORM.
+
+tracemalloc запускается и останавливается администратором на работающем воркере, пока он
+включён, каждое выделение памяти замедляется. Снимки хранятся в памяти воркера, самые старые
+удаляются сверх max_snapshots. Статистика объектов ORM собирается обходом объектов сборщика
+мусора и выполняется только по запросу.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import gc
+import tracemalloc
+from collections import Counter, OrderedDict
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from social_network_api.db.models import BaseModel
+from social_network_api.schemas import config
+
+# Выделения памяти самого tracemalloc и импорта модулей не относятся к приложению
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(inclusive=False, filename_pattern=tracemalloc.__file__),
+    tracemalloc.Filter(inclusive=False, filename_pattern="<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(inclusive=False, filename_pattern="<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(inclusive=False, filename_pattern="<unknown>"),
+)
+
+
+class MemoryDiagnostics:
+    """Запускает tracemalloc, хранит снимки и сравнивает их по файлу и строке."""
+
+    def __init__(self, max_snapshots: int) -> None:
+        self.max_snapshots = max_snapshots
+
+        # Размер и количество выделений считаются один раз при снимке, вне цикла событий
+        self._snapshots: OrderedDict[int, tuple[dict[str, Any], tracemalloc.Snapshot]] = (
+            OrderedDict()
+        )
+        self._next_id = 1
+
+    def start(self, frames: int) -> None:
+        """Запускает tracemalloc, если он ещё не запущен."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        """Останавливает tracemalloc и удаляет снимки вместе с освобождаемой ими памятью."""
+        tracemalloc.stop()
+        self._snapshots.clear()
+
+    def status(self) -> dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory()
+
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit(),
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "snapshots": [info for info, _ in self._snapshots.values()],
+        }
+
+    async def take_snapshot(self) -> dict[str, Any]:
+        """Делает снимок выделенной памяти, tracemalloc должен быть запущен."""
+        taken_at = datetime.datetime.now(datetime.UTC)
+        snapshot, size, count = await asyncio.to_thread(_take_snapshot)
+        snapshot_id, self._next_id = self._next_id, self._next_id + 1
+        info = {"id": snapshot_id, "taken_at": taken_at, "size_bytes": size, "count": count}
+
+        self._snapshots[snapshot_id] = (info, snapshot)
+
+        while len(self._snapshots) > self.max_snapshots:
+            self._snapshots.popitem(last=False)
+
+        return info
+
+    async def top(self, snapshot_id: int, limit: int) -> list[dict[str, Any]]:
+        """Возвращает строки кода, выделившие больше всего памяти из живущей в снимке."""
+        snapshot = self._get(snapshot_id)
+        stats = await asyncio.to_thread(snapshot.statistics, "lineno")
+
+        return [_stat(stat) for stat in stats[:limit]]
+
+    async def diff(self, first_id: int, second_id: int, limit: int) -> list[dict[str, Any]]:
+        """Возвращает строки кода с наибольшим ростом памяти от первого снимка ко второму."""
+        first, second = self._get(first_id), self._get(second_id)
+        stats = await asyncio.to_thread(second.compare_to, first, "lineno")
+
+        return [
+            {**_stat(stat), "size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff}
+            for stat in stats[:limit]
+        ]
+
+    def _get(self, snapshot_id: int) -> tracemalloc.Snapshot:
+        if (item := self._snapshots.get(snapshot_id)) is None:
+            msg = f"Снимок {snapshot_id} не найден"
+            raise LookupError(msg)
+
+        return item[1]
+
+
+def _take_snapshot() -> tuple[tracemalloc.Snapshot, int, int]:
+    # Обход всех выделений занимает время, пропорциональное их количеству
+    snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+    stats = snapshot.statistics("filename")
+
+    return snapshot, sum(stat.size for stat in stats), sum(stat.count for stat in stats)
+
+
+def orm_objects() -> dict[str, Any]:
+    """Считает живые объекты моделей и содержимое identity map открытых сессий.
+
+    Объект модели, который есть в памяти, но не в identity map, удерживается не сессией,
+    а, например, кешем или ссылкой из ответа. Выполняется в цикле событий, так как identity map
+    изменяются запросами, и занимает время, пропорциональное количеству объектов процесса.
+    """
+    models = {mapper.class_ for mapper in BaseModel.registry.mappers}
+    objects: Counter[str] = Counter()
+    identity_map: Counter[str] = Counter()
+    sessions = 0
+
+    for obj in gc.get_objects():
+        if type(obj) in models:
+            objects[type(obj).__name__] += 1
+        elif isinstance(obj, Session):
+            sessions += 1
+            identity_map.update(type(instance).__name__ for instance in obj.identity_map.values())
+
+    return {
+        "sessions": sessions,
+        "identity_map_entries": identity_map.total(),
+        "identity_map_by_model": dict(identity_map.most_common()),
+        "objects_by_model": dict(objects.most_common()),
+    }
+
+
+def _stat(stat: tracemalloc.Statistic | tracemalloc.StatisticDiff) -> dict[str, Any]:
+    frame = stat.traceback[0]
+    return {
+        "file": frame.filename,
+        "line": frame.lineno,
+        "size_bytes": stat.size,
+        "count": stat.count,
+    }
+
+
+memory_diagnostics = MemoryDiagnostics(max_snapshots=config.monitoring.memory_max_snapshots)
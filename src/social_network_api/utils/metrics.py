@@ -0,0 +1,131 @@
+"""Метрики приложения для Prometheus на основе prometheus_client.
+
+Если задана переменная окружения PROMETHEUS_MULTIPROC_DIR, каждый воркер uvicorn записывает
+значения в файлы этого каталога, а эндпоинт /metrics любого воркера суммирует файлы всех
+воркеров: счётчики и гистограммы - всех, в том числе завершившихся, а датчики - только
+работающих. Каталог должен существовать и очищаться перед запуском приложения.
+
+Датчики состояния пулов и ограничителей заполняются функциями-сборщиками из add_collector.
+Перед ответом /metrics они вызываются в обрабатывающем его воркере, а в режиме нескольких
+процессов ещё и периодически в каждом воркере, чтобы его значения не устаревали.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import TYPE_CHECKING
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    disable_created_metrics,
+    generate_latest,
+    multiprocess,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+# Серии *_created не нужны для счётчиков, которые Prometheus и так считает от перезапуска
+disable_created_metrics()
+
+_collectors: list[Callable[[], None]] = []
+
+# Последние переданные в set_total значения накопительных счётчиков других объектов
+_totals: dict[tuple[str, tuple[str, ...]], float] = {}
+
+
+def multiprocess_dir() -> str | None:
+    """Возвращает каталог метрик воркеров или None, если метрики только текущего процесса."""
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or None
+
+
+def add_collector(collector: Callable[[], None]) -> None:
+    """Добавляет функцию, которая перед сбором записывает в датчики текущие значения."""
+    _collectors.append(collector)
+
+
+def run_collectors() -> None:
+    for collector in _collectors:
+        collector()
+
+
+async def run_collectors_forever(interval: float) -> None:
+    """Раз в interval обновляет датчики воркера для /metrics других воркеров."""
+    while True:
+        run_collectors()
+        await asyncio.sleep(interval)
+
+
+def render() -> bytes:
+    """Формирует ответ /metrics в текстовом формате Prometheus.
+
+    В режиме нескольких процессов читает файлы всех воркеров, поэтому вызывается вне цикла
+    событий, а сборщики предварительно вызываются через run_collectors.
+    """
+    if (directory := multiprocess_dir()) is None:
+        return generate_latest(REGISTRY)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=directory)
+    return generate_latest(registry)
+
+
+def mark_worker_stopped() -> None:
+    """Удаляет датчики завершающегося воркера, чтобы они не учитывались в сумме."""
+    if (directory := multiprocess_dir()) is not None:
+        multiprocess.mark_process_dead(os.getpid(), directory)
+
+
+def set_total(counter: Counter, total: float, **labels: str) -> None:
+    """Доводит счётчик до total, накопленного в другом объекте, например в статистике пула."""
+    key = (counter._name, tuple(labels.values()))  # noqa: SLF001
+    delta = total - _totals.get(key, 0.0)
+    _totals[key] = total
+
+    if delta > 0:
+        (counter.labels(**labels) if labels else counter).inc(delta)
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки запроса до отправки ответа",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight",
+    "Количество обрабатываемых запросов",
+    ("method",),
+    multiprocess_mode="livesum",
+)
+db_pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Время ожидания соединения из пула PostgreSQL",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+redis_command_duration = Histogram(
+    "redis_command_duration_seconds",
+    "Время выполнения команды или конвейера команд Redis",
+    ("command",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+cache_requests = Counter(
+    "cache_requests_total",
+    "Обращения к кешу объектов по результату: fresh, stale, miss или negative",
+    ("cache", "result"),
+)
+password_hash_duration = Histogram(
+    "password_hash_duration_seconds",
+    "Время хеширования и проверки пароля bcrypt, выполняемых в цикле событий",
+    ("operation",),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0),
+)
+log_records_dropped = Counter(
+    "log_records_dropped_total",
+    "Записи логов, не попавшие в лог: sampled - отсеяны выборкой, queue_full - очередь заполнена",
+    ("reason",),
+)
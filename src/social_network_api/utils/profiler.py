@@ -0,0 +1,219 @@
+"""Непрерывное статистическое профилирование воркера.
+
+Отдельный поток раз в interval снимает стеки всех потоков процесса через
+sys._current_frames() и считает одинаковые стеки. Стек потока цикла событий относится
+к маршруту запроса, который выполняется в этот момент, остальные потоки - к своему имени.
+Результат хранится по минутам за последние window_minutes и выдаётся в формате свёрнутых
+стеков (collapsed, как у flamegraph.pl и speedscope) или готовым SVG flame graph.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import html
+import math
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from typing import TYPE_CHECKING
+
+from social_network_api.db.instrumentation import current_route
+from social_network_api.schemas import config
+
+if TYPE_CHECKING:
+    from types import CodeType, FrameType
+
+# Стеки глубже обрезаются со стороны корня
+MAX_STACK_DEPTH = 256
+
+# Блоки flame graph уже этой ширины в пикселях не рисуются
+MIN_BLOCK_WIDTH = 0.5
+CHAR_WIDTH = 7
+
+SAMPLE_KEY = tuple[str, tuple["CodeType", ...]]
+
+
+class SamplingProfiler:
+    """Снимает стеки потоков процесса с частотой 1 / interval и хранит их по минутам."""
+
+    def __init__(self, interval: float, window_minutes: int) -> None:
+        self.interval = interval
+        self.window_minutes = window_minutes
+
+        self._buckets: deque[tuple[int, Counter[SAMPLE_KEY]]] = deque(maxlen=window_minutes)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    async def run(self) -> None:
+        """Снимает стеки в отдельном потоке, пока задача не будет отменена."""
+        thread = threading.Thread(
+            target=self._sample_forever,
+            args=(asyncio.get_running_loop(), threading.get_ident()),
+            name="sampling-profiler",
+            daemon=True,
+        )
+        self._stopped.clear()
+        thread.start()
+
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self._stopped.set()
+            await asyncio.to_thread(thread.join)
+
+    def folded(self, minutes: int, route: str | None = None) -> list[str]:
+        """Возвращает свёрнутые стеки за последние minutes минут.
+
+        Каждая строка - маршрут или поток, затем функции от корня через ";" и число выборок.
+        """
+        since = self._minute() - minutes
+        merged: Counter[SAMPLE_KEY] = Counter()
+
+        with self._lock:
+            buckets = [samples.copy() for minute, samples in self._buckets if minute > since]
+
+        for samples in buckets:
+            merged.update(samples)
+
+        return [
+            ";".join((label.replace(";", ":"), *map(_frame_name, stack))) + f" {count}"
+            for (label, stack), count in merged.most_common()
+            if route is None or label == route
+        ]
+
+    def _sample_forever(self, loop: asyncio.AbstractEventLoop, loop_thread_id: int) -> None:
+        while not self._stopped.wait(self.interval):
+            self._sample(loop, loop_thread_id)
+
+    def _sample(self, loop: asyncio.AbstractEventLoop, loop_thread_id: int) -> None:
+        own_thread_id = threading.get_ident()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        samples: list[SAMPLE_KEY] = []
+
+        for thread_id, frame in sys._current_frames().items():  # noqa: SLF001
+            if thread_id == own_thread_id:
+                continue
+
+            if thread_id == loop_thread_id:
+                label = _loop_label(loop)
+            else:
+                label = f"thread {thread_names.get(thread_id, thread_id)}"
+
+            samples.append((label, _stack(frame)))
+
+        minute = self._minute()
+
+        with self._lock:
+            if not self._buckets or self._buckets[-1][0] != minute:
+                self._buckets.append((minute, Counter()))
+
+            self._buckets[-1][1].update(samples)
+
+    @staticmethod
+    def _minute() -> int:
+        return int(time.monotonic() // 60)
+
+
+def _loop_label(loop: asyncio.AbstractEventLoop) -> str:
+    # Задача, которую цикл событий выполняет в момент выборки, и запрос из её контекста
+    if (task := asyncio.current_task(loop)) is None:
+        return "(idle)"
+
+    return current_route(task.get_context()) or "(background)"
+
+
+def _stack(frame: FrameType | None) -> tuple[CodeType, ...]:
+    codes: list[CodeType] = []
+
+    while frame is not None and len(codes) < MAX_STACK_DEPTH:
+        codes.append(frame.f_code)
+        frame = frame.f_back
+
+    return tuple(reversed(codes))
+
+
+@functools.lru_cache(maxsize=8192)
+def _frame_name(code: CodeType) -> str:
+    return f"{code.co_qualname} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(
+        ";", ":"
+    )
+
+
+def _short_path(filename: str) -> str:
+    # Путь относительно site-packages или каталога исходников, как в импорте
+    for prefix in sorted(filter(None, sys.path), key=len, reverse=True):
+        if filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1 :]
+
+    return filename
+
+
+def render_flamegraph(folded: list[str], title: str) -> str:
+    """Рисует flame graph в формате SVG по свёрнутым стекам.
+
+    Ширина блока пропорциональна количеству выборок, подсказка блока содержит
+    полное имя функции и долю выборок.
+    """
+    root: dict[str, list] = {}
+    total = 0
+
+    for line in folded:
+        stack, _, count = line.rpartition(" ")
+        total += int(count)
+        children = root
+
+        for name in stack.split(";"):
+            node = children.setdefault(name, [0, {}])
+            node[0] += int(count)
+            children = node[1]
+
+    width, row_height, padding = 1200, 16, 10
+    depth = _depth(root)
+    height = (depth + 1) * row_height + 2 * padding
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">',
+        f'<text x="{padding}" y="{padding + 2}">{html.escape(title)}, выборок: {total}</text>',
+    ]
+
+    def draw(children: dict[str, list], x: float, level: int) -> None:
+        for name, (count, grandchildren) in sorted(children.items()):
+            node_width = (width - 2 * padding) * count / max(total, 1)
+
+            if node_width >= MIN_BLOCK_WIDTH:
+                y = height - padding - (level + 1) * row_height
+                label = name[: math.floor(node_width / CHAR_WIDTH)]
+                parts.append(
+                    f"<g><title>{html.escape(name)} ({count}, {count / total:.1%})</title>"
+                    f'<rect x="{x:.1f}" y="{y}" width="{node_width:.1f}" '
+                    f'height="{row_height - 1}" fill="{_color(name)}"/>'
+                    f'<text x="{x + 2:.1f}" y="{y + row_height - 4}">'
+                    f"{html.escape(label)}</text></g>"
+                )
+                draw(grandchildren, x, level + 1)
+
+            x += node_width
+
+    draw(root, padding, 0)
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def _depth(children: dict[str, list]) -> int:
+    return max((1 + _depth(node[1]) for node in children.values()), default=0)
+
+
+def _color(name: str) -> str:
+    # Стабильный тёплый цвет для одной и той же функции
+    value = zlib.crc32(name.encode("utf-8"))
+    return f"rgb({205 + value % 50},{(value >> 8) % 180},{(value >> 16) % 55})"
+
+
+sampling_profiler = SamplingProfiler(
+    interval=config.monitoring.sampling_interval_seconds,
+    window_minutes=config.monitoring.sampling_window_minutes,
+)
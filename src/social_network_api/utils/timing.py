@@ -0,0 +1,150 @@
+"""Замер времени этапов обработки запроса для заголовка Server-Timing."""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, override
+
+from fastapi.routing import APIRoute, request_response
+
+from social_network_api.utils.tracing import traced
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Coroutine, Iterator
+
+    from fastapi import Request, Response
+
+
+class RequestTimings:
+    """Суммарное время и количество выполнений каждого этапа одного запроса.
+
+    Вложенные замеры одного и того же этапа (например DAL метод, вызывающий другой DAL метод)
+    учитываются один раз. Разные этапы могут пересекаться: время auth включает время jwt.
+    """
+
+    __slots__ = ("active", "handler_finished_at", "phases")
+
+    def __init__(self) -> None:
+        self.phases: dict[str, list[float]] = {}
+        self.handler_finished_at: float | None = None
+        self.active: set[str] = set()
+
+    def add(self, name: str, duration: float) -> None:
+        phase = self.phases.setdefault(name, [0.0, 0])
+        phase[0] += duration
+        phase[1] += 1
+
+
+_current_timings: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+_current_operation: ContextVar[str | None] = ContextVar("current_operation", default=None)
+
+
+@contextmanager
+def track_timings() -> Iterator[RequestTimings]:
+    """Собирает время этапов, замеренных через timed внутри блока."""
+    timings = RequestTimings()
+    token = _current_timings.set(timings)
+
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Замеряет время блока как этап name, если запрос выбран для замера.
+
+    Вне track_timings ничего не замеряет, поэтому может оставаться в коде постоянно.
+    """
+    timings = _current_timings.get()
+
+    if timings is None or name in timings.active:
+        yield
+        return
+
+    timings.active.add(name)
+    started_at = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started_at)
+        timings.active.discard(name)
+
+
+def timed_async[**P, T](
+    name: str,
+) -> Callable[[Callable[P, Awaitable[T]]], Callable[P, Awaitable[T]]]:
+    """Декоратор асинхронной функции, замеряющий её выполнение как этап name.
+
+    Функция также выполняется внутри span трассировки со своим именем (например PostDAL.get_by_id),
+    а её имя доступно через current_operation, например для журнала медленных запросов.
+    Не подходит для зависимостей FastAPI: аннотации обёртки разрешаются в другом модуле.
+    """
+
+    def decorator(func: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            token = _current_operation.set(func.__qualname__)
+
+            try:
+                with timed(name), traced(func.__qualname__):
+                    return await func(*args, **kwargs)
+            finally:
+                _current_operation.reset(token)
+
+        return wrapper
+
+    return decorator
+
+
+def current_operation() -> str | None:
+    """Возвращает имя ближайшей выполняемой функции, обёрнутой timed_async."""
+    return _current_operation.get()
+
+
+class TimedRoute(APIRoute):
+    """Маршрут, замеряющий время эндпоинта (handler) и формирования ответа (encode).
+
+    Время encode отсчитывается от завершения эндпоинта до готового ответа и включает проверку
+    response_model, сериализацию в JSON и закрытие зависимостей с yield.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, endpoint, **kwargs)
+
+        # Сигнатура эндпоинта уже разобрана, поэтому обёртка не влияет на его зависимости.
+        # Синхронные эндпоинты не оборачиваются, чтобы FastAPI выполнял их в пуле потоков
+        if inspect.iscoroutinefunction(call := self.dependant.call):
+
+            @functools.wraps(call)
+            async def timed_endpoint(*args: Any, **kwargs: Any) -> Any:
+                with timed("handler"), traced(call.__qualname__):
+                    result = await call(*args, **kwargs)
+
+                if (timings := _current_timings.get()) is not None:
+                    timings.handler_finished_at = time.perf_counter()
+
+                return result
+
+            self.dependant.call = timed_endpoint
+            self.app = request_response(self.get_route_handler())
+
+    @override
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            response = await handler(request)
+
+            if (timings := _current_timings.get()) is not None and timings.handler_finished_at:
+                timings.add("encode", time.perf_counter() - timings.handler_finished_at)
+
+            return response
+
+        return timed_handler
@@ -0,0 +1,425 @@
+"""Трассировка запросов в модели данных OpenTelemetry.
+
+Контекст трассировки передаётся в заголовке traceparent (W3C Trace Context), а завершённые
+span экспортируются пачками в фоне в формате OTLP JSON (ExportTraceServiceRequest), который
+принимают OpenTelemetry Collector, Jaeger и Tempo. Экспортёр выбирается настройкой
+monitoring.tracing_exporter: console, file, otlp или путь вида "module:Class" к классу
+с методами export(spans) и shutdown().
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import importlib
+import json
+import logging
+import os
+import random
+import re
+import secrets
+import time
+import urllib.request
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal, Protocol
+
+from sqlalchemy import event
+
+from social_network_api.schemas import config
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterator
+
+    from sqlalchemy.engine import Connection, ExceptionContext
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger("social_network_api")
+
+SPAN_KIND = Literal["server", "internal", "client"]
+
+# Длина текста SQL запроса в атрибуте span
+MAX_STATEMENT_LENGTH = 2000
+
+# Значения перечислений OTLP, в JSON они передаются числами
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+STATUS_CODES = {"unset": 0, "ok": 1, "error": 2}
+
+OTLP_TIMEOUT_SECONDS = 10
+
+TRACEPARENT_PATTERN = re.compile(r"00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})")
+
+
+@dataclass(slots=True)
+class Span:
+    """Операция внутри трассировки."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None
+    kind: SPAN_KIND = "internal"
+    attributes: dict[str, Any] = field(default_factory=dict)
+    start_time_ns: int = field(default_factory=time.time_ns)
+    end_time_ns: int | None = None
+    status: Literal["unset", "ok", "error"] = "unset"
+    status_message: str = ""
+
+    def end(self, exc: BaseException | None = None) -> None:
+        self.end_time_ns = time.time_ns()
+
+        if exc is not None:
+            self.status = "error"
+            self.status_message = f"{type(exc).__name__}: {exc}"
+
+        tracer.finished(self)
+
+    def to_otlp(self) -> dict[str, Any]:
+        """Возвращает span в формате Span из OTLP JSON."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "kind": SPAN_KINDS[self.kind],
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": STATUS_CODES[self.status], "message": self.status_message},
+        }
+
+
+def otlp_request(spans: list[Span]) -> dict[str, Any]:
+    """Собирает ExportTraceServiceRequest из span одного процесса."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": _otlp_attributes(
+                        {"service.name": config.api.name, "process.pid": os.getpid()}
+                    )
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "social_network_api"},
+                        "spans": [span.to_otlp() for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    # bool проверяется раньше int, так как является его подклассом, а int64 передаётся строкой
+    match value:
+        case bool():
+            return {"boolValue": value}
+        case int():
+            return {"intValue": str(value)}
+        case float():
+            return {"doubleValue": value}
+        case _:
+            return {"stringValue": str(value)}
+
+
+class SpanExporter(Protocol):
+    """Получатель завершённых span, вызывается вне цикла событий."""
+
+    def export(self, spans: list[Span]) -> None: ...
+
+    def shutdown(self) -> None: ...
+
+
+class ConsoleSpanExporter:
+    """Записывает каждую пачку span в лог приложения одной строкой OTLP JSON."""
+
+    def export(self, spans: list[Span]) -> None:
+        logger.info("spans %s", json.dumps(otlp_request(spans), ensure_ascii=False))
+
+    def shutdown(self) -> None:
+        pass
+
+
+class FileSpanExporter:
+    """Дописывает пачки span в файл, по одному ExportTraceServiceRequest на строку.
+
+    Такой файл читает приёмник otlpjsonfile OpenTelemetry Collector.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, spans: list[Span]) -> None:
+        with self.path.open("a", encoding="utf-8") as file:
+            file.write(json.dumps(otlp_request(spans), ensure_ascii=False) + "\n")
+
+    def shutdown(self) -> None:
+        pass
+
+
+class OtlpHttpSpanExporter:
+    """Отправляет пачки span по OTLP/HTTP в формате JSON, например в OpenTelemetry Collector."""
+
+    def __init__(self, endpoint: str) -> None:
+        self.endpoint = endpoint
+
+    def export(self, spans: list[Span]) -> None:
+        request = urllib.request.Request(  # noqa: S310
+            self.endpoint,
+            data=json.dumps(otlp_request(spans), ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+
+        with urllib.request.urlopen(request, timeout=OTLP_TIMEOUT_SECONDS):  # noqa: S310
+            pass
+
+    def shutdown(self) -> None:
+        pass
+
+
+def create_exporter(name: str, file_path: str, otlp_endpoint: str) -> SpanExporter | None:
+    """Создаёт экспортёр по настройке monitoring.tracing_exporter, none отключает трассировку."""
+    match name:
+        case "none" | "":
+            return None
+        case "console":
+            return ConsoleSpanExporter()
+        case "file":
+            return FileSpanExporter(file_path)
+        case "otlp":
+            return OtlpHttpSpanExporter(otlp_endpoint)
+        case _:
+            module_name, _, class_name = name.partition(":")
+            return getattr(importlib.import_module(module_name), class_name)()
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Создаёт span и накапливает завершённые до экспорта.
+
+    Трассируется доля sample_rate запросов. Решение о трассировке из traceparent принимается
+    только от доверенных вызывающих, например других сервисов, иначе клиент мог бы включить
+    трассировку каждого своего запроса. У остальных traceparent только связывает span
+    с трассировкой клиента, если запрос выбран с долей sample_rate.
+    Вне трассируемого запроса span не создаются, поэтому вызовы traced остаются почти бесплатными.
+    Трассировка включается назначением экспортёра при запуске приложения.
+    Если экспортёр не успевает, span сверх max_queue отбрасываются.
+    """
+
+    def __init__(self, sample_rate: float, max_queue: int) -> None:
+        self.sample_rate = sample_rate
+        self.max_queue = max_queue
+        self.exporter: SpanExporter | None = None
+
+        self.dropped_total = 0
+
+        self._queue: deque[Span] = deque()
+
+    def start_trace(
+        self,
+        name: str,
+        traceparent: str | None,
+        *,
+        trusted: bool,
+        **attributes: Any,
+    ) -> Span | None:
+        """Создаёт корневой span запроса или возвращает None, если запрос не трассируется.
+
+        trusted разрешает следовать флагу sampled из traceparent.
+        """
+        if self.exporter is None:
+            return None
+
+        parent = _parse_traceparent(traceparent)
+
+        if parent is not None and trusted:
+            sampled = parent[2]
+        else:
+            sampled = random.random() < self.sample_rate  # noqa: S311
+
+        if not sampled:
+            return None
+
+        if parent is None:
+            trace_id, parent_span_id = secrets.token_hex(16), None
+        else:
+            trace_id, parent_span_id, _ = parent
+
+        return Span(
+            name,
+            trace_id,
+            secrets.token_hex(8),
+            parent_span_id,
+            kind="server",
+            attributes=attributes,
+        )
+
+    def start_span(self, name: str, kind: SPAN_KIND = "internal", **attributes: Any) -> Span | None:
+        """Создаёт дочерний span текущего или возвращает None вне трассируемого запроса."""
+        if (parent := _current_span.get()) is None:
+            return None
+
+        return Span(
+            name,
+            parent.trace_id,
+            secrets.token_hex(8),
+            parent.span_id,
+            kind=kind,
+            attributes=attributes,
+        )
+
+    def finished(self, span: Span) -> None:
+        if len(self._queue) >= self.max_queue:
+            self.dropped_total += 1
+            return
+
+        self._queue.append(span)
+
+    async def run_exports(self, interval: float) -> None:
+        """Раз в interval передаёт накопленные span экспортёру в отдельном потоке."""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await asyncio.to_thread(self._export)
+        finally:
+            self._export()
+
+            if self.exporter is not None:
+                self.exporter.shutdown()
+
+    def _export(self) -> None:
+        if self.exporter is None or not self._queue:
+            return
+
+        spans = [self._queue.popleft() for _ in range(len(self._queue))]
+
+        try:
+            self.exporter.export(spans)
+        except Exception:
+            logger.exception("Не удалось экспортировать %d span", len(spans))
+
+
+@contextmanager
+def use_span(span: Span | None) -> Iterator[Span | None]:
+    """Делает span текущим на время блока и завершает его после блока."""
+    if span is None:
+        yield None
+        return
+
+    token = _current_span.set(span)
+
+    try:
+        yield span
+    except BaseException as exc:
+        span.end(exc)
+        raise
+    else:
+        span.end()
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def traced(name: str, kind: SPAN_KIND = "internal", **attributes: Any) -> Iterator[Span | None]:
+    """Выполняет блок внутри дочернего span, если текущий запрос трассируется."""
+    with use_span(tracer.start_span(name, kind, **attributes)) as span:
+        yield span
+
+
+def traced_async[**P, T](
+    name: str | None = None,
+) -> Callable[[Callable[P, Awaitable[T]]], Callable[P, Awaitable[T]]]:
+    """Декоратор асинхронной функции, выполняющий её внутри span (по умолчанию с её именем).
+
+    Не подходит для зависимостей FastAPI: аннотации обёртки разрешаются в другом модуле.
+    """
+
+    def decorator(func: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            with traced(span_name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def current_traceparent() -> str | None:
+    """Возвращает заголовок traceparent текущего span для передачи в другие сервисы."""
+    if (span := _current_span.get()) is None:
+        return None
+
+    return f"00-{span.trace_id}-{span.span_id}-01"
+
+
+def current_trace_id() -> str | None:
+    """Возвращает идентификатор трассировки текущего запроса, если он трассируется."""
+    if (span := _current_span.get()) is None:
+        return None
+
+    return span.trace_id
+
+
+def attach_tracing_listeners(engine: AsyncEngine) -> None:
+    """Создаёт span для каждого SQL запроса движка внутри трассируемого запроса."""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
+
+def _before_cursor_execute(conn: Connection, _: Any, statement: str, *__: Any) -> None:
+    span = tracer.start_span(
+        "db.query",
+        "client",
+        **{
+            "db.system": "postgresql",
+            "db.statement": statement[:MAX_STATEMENT_LENGTH],
+        },
+    )
+
+    if span is not None:
+        conn.info.setdefault("trace_spans", []).append(span)
+
+
+def _after_cursor_execute(conn: Connection, *_: Any) -> None:
+    if spans := conn.info.get("trace_spans"):
+        spans.pop().end()
+
+
+def _handle_error(context: ExceptionContext) -> None:
+    if context.connection is not None and (spans := context.connection.info.get("trace_spans")):
+        spans.pop().end(context.original_exception)
+
+
+def _parse_traceparent(traceparent: str | None) -> tuple[str, str, bool] | None:
+    if not traceparent or not (match := TRACEPARENT_PATTERN.fullmatch(traceparent.strip())):
+        return None
+
+    trace_id, parent_span_id, flags = match.groups()
+
+    # Нулевые идентификаторы недопустимы по спецификации
+    if not trace_id.strip("0") or not parent_span_id.strip("0"):
+        return None
+
+    return trace_id, parent_span_id, bool(int(flags, 16) & 1)
+
+
+tracer = Tracer(
+    sample_rate=config.monitoring.tracing_sample_rate,
+    max_queue=config.monitoring.tracing_max_queue,
+)
@@ -0,0 +1,98 @@
+"""Общие фикстуры тестов.
+
+Тесты выполняют приложение в той же задаче asyncio через httpx.ASGITransport и работают
+с настоящими PostgreSQL и Redis из переменных DATABASE_PS_URL и DATABASE_RD_URL. База данных
+должна быть обновлена миграциями (alembic upgrade head), строки, созданные тестами,
+удаляются после них.
+"""
+
+from __future__ import annotations
+
+import uuid
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from social_network_api.db import instrumentation
+from social_network_api.db.cache import response_cache
+from social_network_api.db.connection import engine, rd_pool, session_maker
+from social_network_api.db.models import CommentModel, PostModel, UserModel
+from social_network_api.main import app
+from social_network_api.utils.auth import generate_access_token
+from sqlalchemy import delete
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable, Iterator
+    from contextlib import AbstractContextManager
+
+    from social_network_api.db.instrumentation import QueryStats
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+async def db() -> AsyncIterator[AsyncSession]:
+    """Сессия для подготовки данных теста в обход API."""
+    async with session_maker() as session:
+        yield session
+
+    # Соединения пулов привязаны к циклу событий теста и не должны переходить в следующий
+    await engine.dispose()
+    await rd_pool.disconnect()
+
+
+@pytest.fixture
+async def client() -> AsyncIterator[AsyncClient]:
+    async with AsyncClient(transport=ASGITransport(app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+async def user(db: AsyncSession) -> AsyncIterator[UserModel]:
+    """Пользователь с ролью user, удаляемый вместе со своими постами и комментариями после теста."""
+    user = UserModel(
+        name="Тестовый пользователь",
+        email=f"{uuid.uuid4().hex}@example.com",
+        _password="test-password",
+    )
+    db.add(user)
+    await db.commit()
+
+    yield user
+
+    await db.execute(delete(CommentModel).where(CommentModel.user_id == user.id))
+    await db.execute(delete(PostModel).where(PostModel.user_id == user.id))
+    await db.execute(delete(UserModel).where(UserModel.id == user.id))
+    await db.commit()
+
+
+@pytest.fixture
+async def user_client(client: AsyncClient, user: UserModel) -> AsyncClient:
+    """Клиент, авторизованный как user."""
+    client.cookies.set("access_token", await generate_access_token(user.id))
+    return client
+
+
+@pytest.fixture
+def query_budget() -> Callable[[int], AbstractContextManager[QueryStats]]:
+    """Возвращает query_budget, перед проверкой сбрасывающий кеш ответов.
+
+    Иначе значения, загруженные предыдущими запросами теста, не дошли бы до базы данных
+    и не были бы учтены. Пример:
+        with query_budget(4):
+            await user_client.get("/posts/")
+    """
+
+    @contextmanager
+    def budget(max_queries: int) -> Iterator[QueryStats]:
+        response_cache.invalidate("users", "posts", "comments", "role_rules")
+
+        with instrumentation.query_budget(max_queries) as stats:
+            yield stats
+
+    return budget
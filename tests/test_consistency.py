@@ -0,0 +1,41 @@
+"""Чтение своих записей по токену согласованности."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+from social_network_api.db.models import PostModel
+from social_network_api.db.replicas import CONSISTENCY_HEADER
+from sqlalchemy import text, update
+
+if TYPE_CHECKING:
+    from httpx import AsyncClient
+    from social_network_api.db.models import UserModel
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_token_read_bypasses_cache(
+    db: AsyncSession,
+    user: UserModel,
+    user_client: AsyncClient,
+) -> None:
+    """Запрос с токеном видит запись, которой ещё нет в кеше воркера."""
+    post = PostModel(content="До записи", user_id=user.id)
+    db.add(post)
+    await db.commit()
+
+    assert (await user_client.get(f"/posts/{post.id}")).json()["content"] == "До записи"
+
+    # Запись другого воркера, который не может сбросить кеш этого
+    await db.execute(update(PostModel).where(PostModel.id == post.id).values(content="После"))
+    await db.commit()
+    lsn = await db.scalar(text("SELECT pg_current_wal_insert_lsn()::text"))
+
+    response = await user_client.get(f"/posts/{post.id}", headers={CONSISTENCY_HEADER: lsn})
+
+    assert response.status_code == 200
+    assert response.json()["content"] == "После"
+    assert (await user_client.get(f"/posts/{post.id}")).json()["content"] == "До записи"
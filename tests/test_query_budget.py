@@ -0,0 +1,138 @@
+"""Количество запросов к базе данных в эндпоинтах списков, include и обновления поста."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+from social_network_api.db.instrumentation import track_queries
+from social_network_api.db.models import CommentModel, PostModel
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from contextlib import AbstractContextManager
+
+    from httpx import AsyncClient
+    from social_network_api.db.instrumentation import QueryStats
+    from social_network_api.db.models import UserModel
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.anyio
+
+# Пользователь, два правила доступа, посты с авторами и комментарии постов
+POSTS_LIST_BUDGET = 5
+# Пользователь, два правила доступа, комментарии с авторами и постами
+COMMENTS_LIST_BUDGET = 4
+# Пользователь, два правила доступа, пользователи, их посты с комментариями
+# и их комментарии с постами и авторами постов
+USERS_INCLUDE_BUDGET = 6
+# Пост, пользователь, четыре правила доступа (update и read), пост в DAL, UPDATE
+# и повторная загрузка поста, каждая загрузка поста - с комментариями вторым запросом
+POST_UPDATE_BUDGET = 12
+
+ROWS_COUNTS = [1, 20]
+
+
+async def add_posts(db: AsyncSession, user: UserModel, count: int) -> list[PostModel]:
+    """Создаёт count постов пользователя с одним комментарием под каждым."""
+    posts = [PostModel(content=f"Пост {i}", user_id=user.id) for i in range(count)]
+    db.add_all(posts)
+    await db.commit()
+
+    db.add_all(
+        CommentModel(content="Комментарий", user_id=user.id, post_id=post.id) for post in posts
+    )
+    await db.commit()
+
+    return posts
+
+
+@pytest.mark.parametrize("posts_count", ROWS_COUNTS)
+async def test_posts_list_within_budget(
+    posts_count: int,
+    db: AsyncSession,
+    user: UserModel,
+    user_client: AsyncClient,
+    query_budget: Callable[[int], AbstractContextManager[QueryStats]],
+) -> None:
+    """Количество запросов не растёт с количеством постов (нет N+1)."""
+    await add_posts(db, user, posts_count)
+
+    with query_budget(POSTS_LIST_BUDGET):
+        response = await user_client.get("/posts/")
+
+    assert response.status_code == 200
+    assert len(response.json()) >= posts_count
+
+
+@pytest.mark.parametrize("comments_count", ROWS_COUNTS)
+async def test_comments_list_within_budget(
+    comments_count: int,
+    db: AsyncSession,
+    user: UserModel,
+    user_client: AsyncClient,
+    query_budget: Callable[[int], AbstractContextManager[QueryStats]],
+) -> None:
+    await add_posts(db, user, comments_count)
+
+    with query_budget(COMMENTS_LIST_BUDGET):
+        response = await user_client.get("/comments/")
+
+    assert response.status_code == 200
+    assert len(response.json()) >= comments_count
+
+
+@pytest.mark.parametrize("posts_count", ROWS_COUNTS)
+async def test_users_include_within_budget(
+    posts_count: int,
+    db: AsyncSession,
+    user: UserModel,
+    user_client: AsyncClient,
+    query_budget: Callable[[int], AbstractContextManager[QueryStats]],
+) -> None:
+    """Вложенные посты и комментарии загружаются общими запросами на всех пользователей."""
+    await add_posts(db, user, posts_count)
+
+    with query_budget(USERS_INCLUDE_BUDGET):
+        response = await user_client.get("/users/", params={"include": ["posts", "comments"]})
+
+    assert response.status_code == 200
+    (user_info,) = [info for info in response.json() if info["id"] == str(user.id)]
+    assert len(user_info["posts"]) == len(user_info["comments"]) == posts_count
+
+
+@pytest.mark.parametrize("comments_count", ROWS_COUNTS)
+async def test_post_update_within_budget(
+    comments_count: int,
+    db: AsyncSession,
+    user: UserModel,
+    user_client: AsyncClient,
+    query_budget: Callable[[int], AbstractContextManager[QueryStats]],
+) -> None:
+    """Количество запросов не растёт с количеством комментариев поста."""
+    (post, *_) = await add_posts(db, user, 1)
+    db.add_all(
+        CommentModel(content=f"Комментарий {i}", user_id=user.id, post_id=post.id)
+        for i in range(comments_count)
+    )
+    await db.commit()
+
+    with query_budget(POST_UPDATE_BUDGET):
+        response = await user_client.patch(f"/posts/{post.id}", json={"content": "Изменён"})
+
+    assert response.status_code == 200
+    assert len(response.json()["comments"]) == comments_count + 1
+
+
+async def test_failed_query_counted(db: AsyncSession) -> None:
+    """Запрос с ошибкой учитывается и не оставляет время начала в соединении."""
+    with track_queries() as stats:
+        with pytest.raises(DBAPIError):
+            await db.execute(text("SELECT 1 / 0"))
+
+        connection = await db.connection()
+        assert "query_started_at" not in connection.info
+
+    assert stats.count == 1
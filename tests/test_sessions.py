@@ -0,0 +1,57 @@
+"""Завершение всех сессий пользователя."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from social_network_api.db.bloom import email_filter
+from social_network_api.db.connection import get_redis
+from social_network_api.utils import auth
+
+if TYPE_CHECKING:
+    from httpx import AsyncClient
+    from social_network_api.db.models import UserModel
+
+pytestmark = pytest.mark.anyio
+
+
+async def login(client: AsyncClient, user: UserModel) -> dict[str, str]:
+    # Пользователь создан в обход API, поэтому его email добавляется в фильтр отдельно
+    await email_filter.add(user.email, get_redis())
+    response = await client.post("/auth/", json={"email": user.email, "_password": "test-password"})
+    assert response.status_code == 200
+
+    return response.json()
+
+
+async def test_revoked_sessions_rejected_without_redis(
+    client: AsyncClient,
+    user: UserModel,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Refresh токен не обновляется после выхода со всех устройств, даже если Redis недоступен."""
+    tokens = await login(client, user)
+
+    async def unavailable(*_: object) -> int:
+        raise RedisConnectionError
+
+    monkeypatch.setattr(auth, "revoke_all_user_sessions", unavailable)
+
+    response = await client.delete(
+        "/auth/sessions", cookies={"access_token": tokens["access_token"]}
+    )
+    assert response.status_code == 204
+
+    response = await client.post(
+        "/auth/refresh", cookies={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 403
+
+    # Новый вход после завершения сессий работает как обычно
+    tokens = await login(client, user)
+    response = await client.post(
+        "/auth/refresh", cookies={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 200